@@ -0,0 +1,104 @@
+# aggregator.py
+import os
+import time
+import asyncio
+import logging
+from decimal import Decimal
+
+logger = logging.getLogger("alert_aggregator")
+
+ALERT_WINDOW = float(os.getenv("ALERT_WINDOW", "60"))  # seconds of activity rolled into one post; 0 disables
+
+STATE_LABELS = {
+    "pump": "🚀 BIG PUMP ALERT (10%+)",
+    "dump": "📉 BIG DUMP ALERT (10%+)",
+}
+ALERT_KINDS = ("pump", "dump", "buy")  # what a watchlist can subscribe to
+
+
+class TokenWindow:
+    __slots__ = ("pair", "opened_at", "buy_total", "buy_count", "states")
+
+    def __init__(self, pair, opened_at):
+        self.pair = pair
+        self.opened_at = opened_at
+        self.buy_total = Decimal(0)
+        self.buy_count = 0
+        self.states = []  # pump/dump transitions in order, consecutive repeats merged
+
+
+def digest_label(window):
+    parts = []
+    if window.states:
+        parts.append(" → ".join(STATE_LABELS[s] for s in window.states))
+    if window.buy_count == 1:
+        parts.append(f"💰 BUY DETECTED (${window.buy_total:,.2f})")
+    elif window.buy_count > 1:
+        parts.append(f"💰 {window.buy_count} BUYS DETECTED (${window.buy_total:,.2f})")
+    return "\n".join(parts)
+
+
+def digest_kinds(window):
+    kinds = list(dict.fromkeys(window.states))
+    if window.buy_count:
+        kinds.append("buy")
+    return kinds
+
+
+class AlertAggregator:
+    """Rolls per-token buy/pump/dump events into one digest post per window."""
+
+    def __init__(self, emit, window=ALERT_WINDOW):
+        self.emit = emit  # async (pair, label, address=, kinds=)
+        self.window = window
+        self._windows = {}  # token_address: TokenWindow
+        self.events = 0
+        self.digests = 0
+        self.is_running = False
+
+    def _open(self, address, pair):
+        w = self._windows.get(address)
+        if w is None:
+            w = self._windows[address] = TokenWindow(pair, time.monotonic())
+        else:
+            w.pair = pair  # digest renders the latest numbers
+        return w
+
+    async def record_buy(self, address, pair, last_volume, new_volume):
+        self.events += 1
+        w = self._open(address, pair)
+        # Decimal of the float reprs: digest totals equal the sum of the individual diffs exactly
+        w.buy_total += Decimal(str(new_volume)) - Decimal(str(last_volume))
+        w.buy_count += 1
+        if not self.window:
+            await self.flush(force=True)
+
+    async def record_state(self, address, pair, state):
+        self.events += 1
+        w = self._open(address, pair)
+        if not w.states or w.states[-1] != state:
+            w.states.append(state)
+        if not self.window:
+            await self.flush(force=True)
+
+    async def flush(self, force=False):
+        """Emit every window that has been open for a full period (or all of them when forced)."""
+        cutoff = time.monotonic() - self.window
+        ready = [a for a, w in self._windows.items() if force or w.opened_at <= cutoff]
+        for address in ready:
+            w = self._windows.pop(address)
+            self.digests += 1
+            try:
+                await self.emit(w.pair, digest_label(w), address=address, kinds=digest_kinds(w))
+            except Exception as e:
+                logger.error(f"Failed to emit digest for {address}: {e}")
+
+    async def run(self):
+        self.is_running = True
+        while self.is_running:
+            await asyncio.sleep(min(1.0, self.window or 1.0))
+            await self.flush()
+        await self.flush(force=True)
+
+    def stats(self):
+        return {"open_windows": len(self._windows), "events": self.events, "digests": self.digests}
@@ -0,0 +1,121 @@
+# benchmarks/bench_decode.py
+# CPU time and allocations per DexScreener response: the old full-dict decode (json.loads and a
+# best-pair scan over the raw pairs) vs pairs.decode_tokens, with the stdlib and orjson parsers.
+#
+#   python benchmarks/bench_decode.py --tokens 30 --pairs-per-token 30
+#   python benchmarks/bench_decode.py --payload recorded1.json --payload recorded2.json
+#
+# Record a payload with: curl -o recorded1.json "https://api.dexscreener.com/latest/dex/tokens/<a>,<b>,..."
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import pairs
+from stubs import make_pair
+
+CHAINS = ("solana", "ethereum", "bsc", "base")
+
+
+def synthetic_payload(tokens, pairs_per_token):
+    """A multi-address response shaped like DexScreener's, with pairs spread over chains."""
+    addresses = [f"TOKEN{i:06d}{'a' * 32}" for i in range(tokens)]
+    body = [
+        make_pair(a, chain=CHAINS[j % len(CHAINS)], index=j, logo_url=f"https://example.invalid/{i}.png")
+        for i, a in enumerate(addresses) for j in range(pairs_per_token)
+    ]
+    return json.dumps({"schemaVersion": "1.0.0", "pairs": body}).encode(), addresses
+
+
+def recorded_payload(path):
+    with open(path, "rb") as f:
+        body = f.read()
+    addresses = {p["baseToken"]["address"] for p in json.loads(body).get("pairs") or []}
+    return body, sorted(addresses)
+
+
+def decode_full(body, addresses):
+    """The pre-change path: group the raw pair dicts per token (kept whole in the token cache), then pick
+    the most liquid pair per chain like select_best_pair."""
+    raw = json.loads(body)
+    wanted = {a.lower(): a for a in addresses}
+    by_token = {}
+    for p in raw["pairs"]:
+        address = wanted.get(str(p.get("baseToken", {}).get("address", "")).lower())
+        if address:
+            by_token.setdefault(address, []).append(p)
+    result = {}
+    for address, own in by_token.items():
+        best = {}
+        for chain in {p.get("chainId") for p in own}:
+            on_chain = [p for p in own if p.get("chainId") == chain]
+            best[chain] = max(on_chain, key=lambda x: float(x.get("liquidity", {}).get("usd", 0) or 0))
+        result[address] = ({"pairs": own}, best)
+    return result
+
+
+def decode_lean(loads):
+    def decode(body, addresses):
+        pairs.loads = loads
+        return pairs.decode_tokens(body, addresses)
+    return decode
+
+
+def measure(decode, body, addresses, repeats):
+    decode(body, addresses)  # warm up
+    start = time.process_time()
+    for _ in range(repeats):
+        decode(body, addresses)
+    cpu = (time.process_time() - start) / repeats
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = decode(body, addresses)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "cpu_ms": round(cpu * 1000, 3),
+        "peak_alloc_kb": round((peak - before) / 1024, 1),
+        "retained_kb": round((retained - before) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=30, help="addresses per synthetic response")
+    parser.add_argument("--pairs-per-token", type=int, default=30)
+    parser.add_argument("--payload", action="append", help="recorded /latest/dex/tokens body; repeatable")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.payload:
+        payloads = {os.path.basename(p): recorded_payload(p) for p in args.payload}
+    else:
+        payloads = {f"synthetic_{args.tokens}x{args.pairs_per_token}": synthetic_payload(args.tokens, args.pairs_per_token)}
+
+    decoders = {"full_dicts": decode_full, "lean_json": decode_lean(json.loads)}
+    try:
+        import orjson
+        decoders["lean_orjson"] = decode_lean(orjson.loads)
+    except ImportError:
+        pass
+
+    results = []
+    for name, (body, addresses) in payloads.items():
+        results.append({
+            "payload": name,
+            "bytes": len(body),
+            "addresses": len(addresses),
+            **{label: measure(decode, body, addresses, args.repeats) for label, decode in decoders.items()},
+        })
+    print(json.dumps({"benchmark": "decode", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_fsm.py
+# Per-update latency of the FSM storage: MemoryStorage vs the SQLite write-back storage,
+# measured through Dispatcher.process_update with a handler doing the usual state reads and writes.
+#
+#   python benchmarks/bench_fsm.py --users 2000 --steps 5
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+
+def message_update(update_id, user_id, text):
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": int(time.time()), "from": user,
+                    "chat": {"id": user_id, "type": "private"}, "text": text},
+    }
+
+
+async def run(storage, users, steps):
+    from aiogram import Bot, Dispatcher, types
+    from aiogram.dispatcher import FSMContext
+
+    bot = Bot(token="123456:BENCHMARKtokenBENCHMARKtoken")
+    Bot.set_current(bot)
+    dp = Dispatcher(bot, storage=storage)
+
+    @dp.message_handler(state="*")
+    async def step(message: types.Message, state: FSMContext):
+        # Same shape as the purchase flow: read the collected data, add to it, move to the next state
+        data = await state.get_data()
+        await state.update_data(step=data.get("step", 0) + 1, ca=message.text,
+                                pair_data={"priceUsd": "0.0012", "liquidity": {"usd": 125000.0}})
+        await state.set_state(f"UserState:step_{data.get('step', 0) + 1}")
+
+    latencies = []
+    update_id = 0
+    for _ in range(steps):
+        for user_id in range(1, users + 1):
+            update_id += 1
+            update = types.Update(**message_update(update_id, user_id, f"0x{user_id:040x}"))
+            start = time.perf_counter()
+            await dp.process_update(update)
+            latencies.append(time.perf_counter() - start)
+    await storage.close()
+    await (await bot.get_session()).close()
+    latencies.sort()
+    return {
+        "updates": len(latencies),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1] * 1e6, 1),
+        "mean_us": round(sum(latencies) / len(latencies) * 1e6, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+        from aiogram.contrib.fsm_storage.memory import MemoryStorage
+        from fsm_storage import SQLiteStorage
+
+        results = {
+            "memory": await run(MemoryStorage(), args.users, args.steps),
+            "sqlite": await run(SQLiteStorage(), args.users, args.steps),
+        }
+
+        # Durability: a fresh storage (a restarted or second process) sees every user's last step
+        reopened = SQLiteStorage()
+        states = [await reopened.get_state(chat=u, user=u) for u in range(1, args.users + 1)]
+        results["sqlite"]["restored_states"] = sum(s == f"UserState:step_{args.steps}" for s in states)
+
+        # Every read goes to the database, as when a user's steps are further apart than FSM_CACHE_TTL
+        results["sqlite_uncached"] = await run(SQLiteStorage(cache_ttl=0), args.users, args.steps)
+    print(json.dumps({"benchmark": "fsm_storage", "users": args.users, "steps": args.steps, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+# benchmarks/bench_http_client.py
+# Before/after latency of a DexScreener lookup: fresh ClientSession per call vs the shared pool.
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import aiohttp
+from bench_suite import summarize
+from http_client import HttpClient
+from stubs import dexscreener_app, start_app
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "500"))
+
+
+async def per_call_session(url):
+    # The pre-pool implementation of fetch_token_info_raw
+    async with aiohttp.ClientSession(headers={"User-Agent": "Mozilla/5.0"}) as session:
+        async with session.get(url, timeout=10) as response:
+            return await response.json() if response.status == 200 else None
+
+
+async def main():
+    runner, base = await start_app(dexscreener_app())
+    url = f"{base}/latest/dex/tokens/So11111111111111111111111111111111111111112"
+    client = HttpClient()
+    results = {}
+    try:
+        for name, fetch in (("per_call_session", per_call_session), ("shared_pool", client.get_json)):
+            await fetch(url)  # warm-up
+            samples = []
+            for _ in range(REQUESTS):
+                start = time.perf_counter()
+                await fetch(url)
+                samples.append(time.perf_counter() - start)
+            results[name] = summarize(samples)
+    finally:
+        await client.close()
+        await runner.cleanup()
+    print(json.dumps({"benchmark": "http_client", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+# benchmarks/bench_payments.py
+# Payment verification pipeline against local DexScreener, Telegram and chain RPC stand-ins:
+# submit-to-activation latency, RPC requests per order and the escalation split.
+#
+#   python benchmarks/bench_payments.py --orders 1000
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from bench_suite import configure_env, summarize
+from stubs import dexscreener_app, rpc_app, start_app, telegram_app
+
+# Share of orders per outcome; "missing" never shows up on-chain and stays pending, "replayed" was mined
+# an hour before its payment details were shown
+OUTCOMES = {"valid": 0.75, "underpaid": 0.05, "wrong_wallet": 0.05, "failed": 0.05, "replayed": 0.05, "missing": 0.05}
+
+
+def make_orders(n, wallets, rng):
+    orders, transfers, expected = [], {}, {}
+    shown_at = time.time()
+    for i in range(n):
+        network = "solana" if i % 2 else "ethereum"
+        if network == "solana":
+            tx_hash = "".join(rng.choice("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz") for _ in range(88))
+        else:
+            tx_hash = "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(64))
+        amount = round(rng.uniform(0.5, 20), 4)
+        outcome = rng.choices(list(OUTCOMES), weights=list(OUTCOMES.values()))[0]
+        wallet = wallets[network]
+        if outcome == "valid":
+            transfers[tx_hash] = (wallet, amount, True)
+        elif outcome == "underpaid":
+            transfers[tx_hash] = (wallet, amount * 0.9, True)
+        elif outcome == "wrong_wallet":
+            transfers[tx_hash] = ("0x" + "1" * 40 if network != "solana" else "Wrong" + "1" * 39, amount, True)
+        elif outcome == "failed":
+            transfers[tx_hash] = (wallet, amount, False)
+        elif outcome == "replayed":
+            transfers[tx_hash] = (wallet, amount, True, shown_at - 3600 - i)
+        expected[tx_hash] = outcome
+        orders.append({
+            "user_id": 100000 + i, "user_name": f"user{i}", "address": f"TOKEN{i:06d}{'a' * 32}",
+            "network": network, "duration": "6h", "usd": 2000, "amount": amount,
+            "unit": "SOL" if network == "solana" else "ETH", "wallet": wallet, "tx_hash": tx_hash,
+            "shown_at": shown_at,
+        })
+    return orders, transfers, expected
+
+
+async def run(n, rpc_latency, seed):
+    rng = random.Random(seed)
+    dex_runner, dex_base = await start_app(dexscreener_app(pairs_per_token=2, chains=("solana", "ethereum")))
+    telegram = telegram_app()
+    tg_runner, tg_base = await start_app(telegram)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(tmp, tg_base, dex_base)
+        os.environ["PAYMENT_POLL_INTERVAL"] = "0.2"
+        os.environ["PAYMENT_RETRY_BASE"] = "0.5"
+        import main
+        from store import store
+
+        orders, transfers, expected = make_orders(n, main.PAYMENT_WALLETS, rng)
+        rpc = rpc_app(transfers, latency=rpc_latency)
+        rpc_runner, rpc_base = await start_app(rpc)
+        for client in main.payment_verifier.clients.values():
+            client.url = rpc_base
+        await main.http.start()
+        main.send_queue.start()
+        verifier = asyncio.create_task(main.payment_verifier.run())
+
+        submitted = {}
+        start = time.perf_counter()
+        for order in orders:
+            order_id = store.create_order(order)
+            submitted[order_id] = order["tx_hash"]
+            main.payment_verifier.wake()
+            await asyncio.sleep(0)
+        decided = n - sum(1 for o in expected.values() if o == "missing")
+        while main.payment_verifier.verified + main.payment_verifier.escalated < decided:
+            if time.perf_counter() - start > 120:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        latencies, outcomes, mismatched = [], {}, 0
+        for order_id, tx_hash in submitted.items():
+            row = store.load_order(order_id)
+            outcomes[row["status"]] = outcomes.get(row["status"], 0) + 1
+            want = {"valid": "activated", "missing": "pending"}.get(expected[tx_hash], "escalated")
+            mismatched += row["status"] != want
+            if row["status"] != "pending":
+                latencies.append(row["updated_at"] - row["created_at"])
+
+        main.payment_verifier.is_running = False
+        main.payment_verifier.wake()
+        await verifier
+        await main.send_queue.stop()
+        await main.http.close()
+        await (await main.bot.get_session()).close()
+        await rpc_runner.cleanup()
+        await tg_runner.cleanup()
+        await dex_runner.cleanup()
+
+    return {
+        "benchmark": "payments",
+        "orders": n,
+        "rpc_latency": rpc_latency,
+        "seconds": round(elapsed, 3),
+        "decision_latency": summarize(latencies),
+        "statuses": outcomes,
+        "wrong_decisions": mismatched,
+        "rpc_requests": rpc["stats"]["requests"],
+        "rpc_calls": rpc["stats"]["calls"],
+        "telegram_methods": telegram["stats"]["methods"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--rpc-latency", type=float, default=0.05, help="stub RPC latency, seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.orders, args.rpc_latency, args.seed)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# benchmarks/bench_suite.py
+# Load test of the monitor sweep, message rendering, logo resizing and the activation flow
+# against local DexScreener and Telegram stand-ins.
+#
+#   python benchmarks/bench_suite.py                       # 100, 1k and 10k tokens
+#   python benchmarks/bench_suite.py --sizes 1000 --output after.json --compare before.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from stubs import dexscreener_app, make_pair, start_app, telegram_app
+
+DEFAULT_SIZES = (100, 1000, 10000)
+SWEEPS = 3
+ACTIVATIONS = 100
+
+
+def summarize(samples):
+    if not samples:
+        return {"n": 0}
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p99_ms": round(samples[max(0, int(len(samples) * 0.99) - 1)] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def configure_env(tmp, telegram_base, dex_base):
+    # Must happen before main is imported: the bot, caches and store read these at import time
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARKtokenBENCHMARKtoken")
+    os.environ["TELEGRAM_API_URL"] = telegram_base
+    os.environ["DEXSCREENER_API"] = dex_base
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+    os.environ["LOGO_CACHE_DIR"] = os.path.join(tmp, "logos")
+    os.environ.setdefault("ALERT_WINDOW", "3600")  # keep alert posting out of sweep timings
+    os.environ.setdefault("GROUP_CHAT_RATE", "1000")
+    os.environ.setdefault("GLOBAL_SEND_RATE", "1000")
+
+
+async def bench_sweep(main, monitor_module, addresses, dex_stats):
+    from timeseries import RingBuffer
+
+    m = monitor_module.TokenMonitor()
+    for address in addresses:
+        m.monitored_tokens[address] = RingBuffer()
+
+    request_times = []
+    fetch_batch = main.fetch_tokens_batch_raw
+
+    async def timed_fetch(batch):
+        start = time.perf_counter()
+        try:
+            return await fetch_batch(batch)
+        finally:
+            request_times.append(time.perf_counter() - start)
+
+    main.fetch_tokens_batch_raw = timed_fetch
+    try:
+        await m.check_tokens()  # warm-up: opens pooled connections, seeds histories
+        request_times.clear()
+        sweep_times = []
+        before = dex_stats["requests"]
+        for _ in range(SWEEPS):
+            start = time.perf_counter()
+            await m.check_tokens()
+            sweep_times.append(time.perf_counter() - start)
+        requests = dex_stats["requests"] - before
+    finally:
+        main.fetch_tokens_batch_raw = fetch_batch
+
+    return {
+        "sweep": summarize(sweep_times),
+        "requests_per_sweep": requests / SWEEPS,
+        "request_latency": summarize(request_times),
+        "history_bytes": m.memory_usage(),
+    }
+
+
+def bench_render(main, addresses):
+    from pairs import PairRecord
+    pairs = [PairRecord.from_json(make_pair(a)) for a in addresses]
+    times = []
+    for pair in pairs:
+        start = time.perf_counter()
+        main.create_professional_message(pair)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+async def bench_resize(main, dex_base, n):
+    from stubs import LOGO_VARIANTS
+    cold, warm = [], []
+    for i in range(n):
+        url = f"{dex_base}/logos/{i % LOGO_VARIANTS}.png"
+        start = time.perf_counter()
+        await main.resize_image(url)
+        (cold if i < LOGO_VARIANTS else warm).append(time.perf_counter() - start)
+    return {"cold": summarize(cold), "warm": summarize(warm)}
+
+
+async def bench_activation(main, monitor_module, addresses, telegram_stats):
+    m = monitor_module.monitor
+    from timeseries import RingBuffer
+    for address in addresses:
+        m.monitored_tokens[address] = RingBuffer()
+
+    times = []
+    before = telegram_stats["requests"]
+    m.is_running = True  # activate as the monitor leader does; other replicas only save to the store
+    for i in range(ACTIVATIONS):
+        order = {"id": i, "user_id": 100000 + i, "address": f"ACT{i:05d}{'x' * 30}", "network": "solana", "duration": "6h"}
+        start = time.perf_counter()
+        # The path the payment verifier and the admin button take
+        if not await main.activate_order(order):
+            raise RuntimeError(f"activation of {order['address']} failed")
+        times.append(time.perf_counter() - start)
+    m.is_running = False
+    return {
+        "latency": summarize(times),
+        "telegram_requests_per_activation": (telegram_stats["requests"] - before) / ACTIVATIONS,
+    }
+
+
+async def run_size(size, dex_latency, pairs_per_token):
+    dex = dexscreener_app(latency=dex_latency, pairs_per_token=pairs_per_token)
+    telegram = telegram_app()
+    dex_runner, dex_base = await start_app(dex)
+    tg_runner, tg_base = await start_app(telegram)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(tmp, tg_base, dex_base)
+        import main
+        import monitor as monitor_module
+
+        addresses = [f"TOKEN{i:06d}{'a' * 32}" for i in range(size)]
+        try:
+            result = {
+                "tokens": size,
+                "monitor": await bench_sweep(main, monitor_module, addresses, dex["stats"]),
+                "create_professional_message": bench_render(main, addresses),
+                "resize_image": await bench_resize(main, dex_base, min(size, 1000)),
+                "activation": await bench_activation(main, monitor_module, addresses, telegram["stats"]),
+            }
+        finally:
+            await main.send_queue.stop()
+            await main.http.close()
+            await (await main.bot.get_session()).close()
+            await dex_runner.cleanup()
+            await tg_runner.cleanup()
+    result["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def flatten(d, prefix=""):
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else str(k)
+        if isinstance(v, dict):
+            out.update(flatten(v, key))
+        elif isinstance(v, (int, float)):
+            out[key] = v
+    return out
+
+
+def compare(current, previous):
+    old = flatten(previous["results"])
+    print(f"{'metric':60} {'before':>12} {'after':>12} {'ratio':>8}")
+    for key, value in flatten(current["results"]).items():
+        if key in old and old[key]:
+            print(f"{key:60} {old[key]:>12.3f} {value:>12.3f} {value / old[key]:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--dex-latency", type=float, default=0.05, help="stub DexScreener latency, seconds")
+    parser.add_argument("--pairs-per-token", type=int, default=1, help="stub payload size")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="previous JSON results to diff against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_size(args.sizes[0], args.dex_latency, args.pairs_per_token))
+        print(json.dumps(result))
+        return
+
+    # One process per size so peak RSS and module-level caches don't leak between runs
+    results = {}
+    for size in args.sizes:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", "--sizes", str(size),
+             "--dex-latency", str(args.dex_latency), "--pairs-per-token", str(args.pairs_per_token)],
+            capture_output=True, text=True, check=True,
+        )
+        results[str(size)] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    report = {
+        "benchmark": "suite",
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "dex_latency": args.dex_latency,
+            "pairs_per_token": args.pairs_per_token,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
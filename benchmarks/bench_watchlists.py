@@ -0,0 +1,164 @@
+# benchmarks/bench_watchlists.py
+# Watchlist alert fan-out against a local fake Telegram API: deliveries/s for one alert rendered
+# once and sent to every subscriber, the rate limits actually seen by Telegram, and event-loop
+# lag while the fan-out runs.
+#
+#   python benchmarks/bench_watchlists.py --subscribers 10000 --alerts 3 --global-rate 1000
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from bench_suite import configure_env, summarize
+from stubs import dexscreener_app, make_pair, start_app, telegram_app
+
+FIRST_CHAT = 1_000_000
+
+
+def serve_telegram(queue, latency):
+    """Child process: the fake Telegram API must not load the bot process being measured."""
+    async def serve():
+        _, base = await start_app(telegram_app(latency=latency, track_sends=True))
+        queue.put(base)
+        await asyncio.Event().wait()
+    asyncio.run(serve())
+
+
+async def telegram_stats(base):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/stats") as resp:
+            return await resp.json()
+
+
+async def sample_lag(lags, tick=0.01):
+    """Event loop lag: how late a short sleep wakes up, appended to lags until cancelled."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - start - tick)
+
+
+def max_in_window(times, window=1.0):
+    """Most sends in any window seconds."""
+    times = sorted(times)
+    return max((i - bisect_left(times, t - window, 0, i) + 1 for i, t in enumerate(times)), default=0)
+
+
+async def run(subscribers, alerts, global_rate, send_workers, tg_latency):
+    queue = multiprocessing.Queue()
+    tg = multiprocessing.Process(target=serve_telegram, args=(queue, tg_latency), daemon=True)
+    tg.start()
+    tg_base = queue.get(timeout=30)
+    dex_runner, dex_base = await start_app(dexscreener_app())
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(tmp, tg_base, dex_base)
+        os.environ["GLOBAL_SEND_RATE"] = str(global_rate)
+        os.environ["SEND_WORKERS"] = str(send_workers)
+        os.environ["FSM_STORAGE"] = "memory"
+        import main
+        from aiogram import Bot
+        from monitor import monitor
+        from pairs import PairRecord
+        from store import store
+        from watchlists import watchlists
+
+        Bot.set_current(main.bot)
+        address = f"TOKEN{0:06d}{'a' * 32}"
+        now = time.time()
+        store.save_activation(address, "solana", "6h", now, now + 6 * 3600)
+        for i in range(subscribers):
+            store.save_subscription(FIRST_CHAT + i, address, "pump,dump,buy", 20, now)
+        started = time.perf_counter()
+        await watchlists.load()
+        index_seconds = time.perf_counter() - started
+
+        renders, uploads = [0], [0]
+        render, resize = main.create_professional_message, main.resize_image
+
+        def counting_render(pair):
+            renders[0] += 1
+            return render(pair)
+
+        async def counting_resize(url, *args):
+            uploads[0] += 1
+            return await resize(url, *args)
+
+        main.create_professional_message, main.resize_image = counting_render, counting_resize
+        await main.http.start()
+        main.send_queue.start()
+
+        pair = PairRecord.from_json(make_pair(address, logo_url=f"{dex_base}/logos/0.png"))
+        expected = subscribers * alerts
+        lags = []
+        lag_task = asyncio.create_task(sample_lag(lags))
+        started = time.perf_counter()
+        start_wall = time.time()
+        for i in range(alerts):
+            await monitor.post_alert(pair, f"🚀 BIG PUMP ALERT #{i + 1}", address=address, kinds=["pump"])
+        first_done = None
+        while watchlists.delivered + watchlists.failed < expected:
+            if first_done is None and watchlists.delivered + watchlists.failed >= subscribers:
+                first_done = time.perf_counter() - started
+            if time.perf_counter() - started > 1800:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        lag_task.cancel()
+        await asyncio.gather(lag_task, return_exceptions=True)
+
+        stats = await telegram_stats(tg_base)
+        sends = {int(chat): times for chat, times in stats["sends"].items() if int(chat) >= FIRST_CHAT}
+        all_times = [t for times in sends.values() for t in times if t >= start_wall]
+        gaps = [b - a for times in sends.values() for a, b in zip(times, times[1:])]
+        result = {
+            "benchmark": "watchlists",
+            "subscribers": subscribers,
+            "alerts": alerts,
+            "global_rate": global_rate,
+            "send_workers": send_workers,
+            "telegram_latency": tg_latency,
+            "index_load_seconds": round(index_seconds, 3),
+            "seconds": round(elapsed, 3),
+            "first_alert_seconds": round(first_done or elapsed, 3),
+            "deliveries_per_second": round((watchlists.delivered + watchlists.failed) / elapsed, 1),
+            "watchlists": watchlists.stats(),
+            "renders": renders[0],
+            "logo_uploads": uploads[0],
+            "max_sends_in_1s": max_in_window(all_times),
+            "min_gap_per_chat_seconds": round(min(gaps), 3) if gaps else None,
+            "loop_lag": summarize(lags),
+            "send_queue": main.send_queue.stats(),
+        }
+        await watchlists.stop()
+        await main.send_queue.stop()
+        await main.http.close()
+        await (await main.bot.get_session()).close()
+        await dex_runner.cleanup()
+        tg.terminate()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--alerts", type=int, default=3, help="alerts posted back to back for the watched token")
+    parser.add_argument("--global-rate", type=float, default=1000, help="GLOBAL_SEND_RATE (Telegram's free tier is ~30/s)")
+    parser.add_argument("--send-workers", type=int, default=64, help="SEND_WORKERS")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="fake Telegram API latency, seconds")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.subscribers, args.alerts, args.global_rate, args.send_workers, args.telegram_latency))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/bench_webhook.py
+# End-to-end webhook mode: N bot replicas share one port; a fake Telegram registers the webhook,
+# POSTs /start updates concurrently and counts the bot's replies.
+#
+#   python benchmarks/bench_webhook.py --replicas 3 --updates 2000
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from stubs import start_app, telegram_app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_update(i):
+    user = {"id": 100000 + i, "is_bot": False, "first_name": f"user{i}"}
+    return {
+        "update_id": i,
+        "message": {
+            "message_id": i, "date": int(time.time()), "from": user,
+            "chat": {"id": user["id"], "type": "private"},
+            "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def wait_until(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    telegram = telegram_app()
+    tg_runner, tg_base = await start_app(telegram)
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            BOT_TOKEN="123456:BENCHMARKtokenBENCHMARKtoken",
+            TELEGRAM_API_URL=tg_base,
+            BOT_MODE="webhook",
+            WEBHOOK_URL="http://127.0.0.1",
+            WEBAPP_HOST="127.0.0.1",
+            WEBAPP_PORT=str(port),
+            WEBAPP_REUSE_PORT="1",
+            METRICS_PORT="0",
+            DB_PATH=os.path.join(tmp, "bench.db"),
+            LOGO_CACHE_DIR=os.path.join(tmp, "logos"),
+            PRIVATE_CHAT_RATE="1000",
+            GLOBAL_SEND_RATE="100000",
+        )
+        procs = [subprocess.Popen([sys.executable, "main.py"], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for _ in range(args.replicas)]
+        try:
+            methods = telegram["stats"]["methods"]
+            if not await wait_until(lambda: methods.get("setWebhook", 0) >= args.replicas, 30):
+                raise SystemExit("replicas did not start")
+
+            url = f"http://127.0.0.1:{port}/webhook"
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies = []
+            async with aiohttp.ClientSession() as session:
+                async def post(i):
+                    async with semaphore:
+                        start = time.perf_counter()
+                        async with session.post(url, json=start_update(i)) as resp:
+                            await resp.read()
+                            assert resp.status == 200, resp.status
+                        latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(post(i) for i in range(1, args.updates + 1)))
+                delivered = await wait_until(lambda: methods.get("sendMessage", 0) >= args.updates, 30)
+                elapsed = time.perf_counter() - start
+
+            await asyncio.sleep(1)  # let the lease settle before checking it
+            leaders = sqlite3.connect(env["DB_PATH"]).execute("SELECT owner FROM leases WHERE name = 'monitor'").fetchall()
+            latencies.sort()
+            print(json.dumps({
+                "benchmark": "webhook",
+                "replicas": args.replicas,
+                "updates": args.updates,
+                "replies": methods.get("sendMessage", 0),
+                "all_replied": delivered,
+                "updates_per_second": round(args.updates / elapsed, 1),
+                "post_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                "post_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+                "monitor_leaders": len(leaders),
+            }, indent=2))
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait(timeout=15)
+            await tg_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+# benchmarks/bench_workers.py
+# Bot responsiveness with the monitor in-process vs sharded over worker processes, and a live
+# rebalance when a worker is added, against the local DexScreener and Telegram stand-ins.
+#
+#   python benchmarks/bench_workers.py --tokens 5000 --workers 2
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from bench_suite import configure_env, summarize
+from stubs import dexscreener_app, start_app, telegram_app
+
+DOUBLE_POLL_GAP = 1.0  # one owner never polls a token this soon again (MIN_POLL_INTERVAL - PIGGYBACK_WINDOW)
+
+
+async def loop_lag(duration, tick=0.01):
+    """Event loop lag: how late a short sleep wakes up, sampled for duration seconds."""
+    lags = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - start - tick)
+    return lags
+
+
+async def start_update_latency(main, n=50):
+    from aiogram import types
+    times = []
+    for i in range(1, n + 1):
+        user = {"id": 500000 + i, "is_bot": False, "first_name": "bench"}
+        update = types.Update(update_id=i, message={
+            "message_id": i, "date": int(time.time()), "from": user, "chat": {"id": user["id"], "type": "private"},
+            "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        })
+        start = time.perf_counter()
+        await main.dp.process_update(update)
+        times.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+    return times
+
+
+def serve_dexscreener(queue, pairs_per_token):
+    """Child process: the stub's own JSON encoding must not load the bot process being measured."""
+    async def serve():
+        _, base = await start_app(dexscreener_app(latency=0.02, pairs_per_token=pairs_per_token, track_polls=True))
+        queue.put(base)
+        await asyncio.Event().wait()
+    asyncio.run(serve())
+
+
+async def poll_stats(base):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/stats") as resp:
+            return (await resp.json())["polls"]
+
+
+def double_polls(polls, since=0.0):
+    return sum(
+        1 for times in polls.values()
+        for a, b in zip(times, times[1:]) if a >= since and b - a < DOUBLE_POLL_GAP
+    )
+
+
+async def run_mode(workers, tokens, duration, pairs_per_token):
+    queue = multiprocessing.Queue()
+    dex = multiprocessing.Process(target=serve_dexscreener, args=(queue, pairs_per_token), daemon=True)
+    dex.start()
+    dex_base = queue.get(timeout=30)
+    telegram = telegram_app()
+    tg_runner, tg_base = await start_app(telegram)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(tmp, tg_base, dex_base)
+        os.environ["MONITOR_WORKERS"] = str(workers)
+        os.environ["FSM_STORAGE"] = "memory"
+        import main
+        from aiogram import Bot
+        from store import store
+
+        Bot.set_current(main.bot)
+
+        now = time.time()
+        for i in range(tokens):
+            store.save_activation(f"TOKEN{i:06d}{'a' * 32}", "solana", "6h", now, now + 6 * 3600)
+        await main.http.start()
+        main.send_queue.start()
+        task = asyncio.create_task(main.tracker.run())
+        try:
+            await asyncio.sleep(2)  # workers start and take their shards
+            lags = await loop_lag(duration)
+            handler = await start_update_latency(main)
+            result = {
+                "mode": f"{workers} workers" if workers else "in-process",
+                "loop_lag": summarize(lags),
+                "start_handler": summarize(handler),
+            }
+            polls = await poll_stats(dex_base)
+            result["tokens_polled"] = len(polls)
+            result["double_polls"] = double_polls(polls)
+            if workers:
+                pool = main.worker_pool
+                before = dict(pool.assigned)
+                started = time.monotonic()
+                await pool.add_worker()
+                result["rebalance"] = {
+                    "seconds": round(time.monotonic() - started, 3),
+                    "moved": sum(1 for a, w in pool.assigned.items() if before.get(a) != w),
+                    "expected": round(tokens / (workers + 1)),
+                    "per_worker": pool.stats()["per_worker"],
+                }
+                await asyncio.sleep(duration)
+                result["rebalance"]["double_polls"] = double_polls(await poll_stats(dex_base), since=started)
+        finally:
+            main.tracker.is_running = False
+            await task
+            await main.send_queue.stop()
+            await main.http.close()
+            await (await main.bot.get_session()).close()
+            await tg_runner.cleanup()
+            dex.terminate()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds sampled per phase")
+    parser.add_argument("--pairs-per-token", type=int, default=20, help="stub payload size")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(asyncio.run(run_mode(args.child, args.tokens, args.duration, args.pairs_per_token))))
+        return
+
+    # Fresh process per mode: main reads MONITOR_WORKERS at import time
+    results = []
+    for workers in (0, args.workers):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", str(workers), "--tokens", str(args.tokens),
+             "--duration", str(args.duration), "--pairs-per-token", str(args.pairs_per_token)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print(json.dumps({"benchmark": "monitor_workers", "tokens": args.tokens, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# benchmarks/stubs.py
+# Local stand-ins for upstream APIs so benchmarks never touch the network.
+import asyncio
+import itertools
+import json
+import time
+import zlib
+from io import BytesIO
+
+from aiohttp import web
+from PIL import Image
+
+LOGO_VARIANTS = 16  # distinct logos served, so caches see realistic reuse
+
+
+def make_pair(address, chain="solana", index=0, logo_url="https://example.invalid/logo.png"):
+    """A DexScreener-shaped pair for address."""
+    return {
+        "chainId": chain,
+        "dexId": "raydium",
+        "url": f"https://dexscreener.com/{chain}/PAIR{index}{address}"[:80],
+        "pairAddress": f"PAIR{index}{address}"[:44],
+        "labels": ["v4"],
+        "baseToken": {"address": address, "name": f"Token {address[:6]}", "symbol": address[:4].upper()},
+        "quoteToken": {"address": "So11111111111111111111111111111111111111112", "name": "Wrapped SOL", "symbol": "SOL"},
+        "priceNative": "0.000000914",
+        "priceUsd": "0.0001234",
+        "txns": {w: {"buys": 120, "sells": 87} for w in ("m5", "h1", "h6", "h24")},
+        "priceChange": {"m5": 0.5, "h1": 2.1, "h6": -3.4, "h24": 12.9},
+        "volume": {"m5": 1200.0, "h1": 15000.0, "h6": 90000.0, "h24": 250000.0},
+        "liquidity": {"usd": 84000.0 - index, "base": 1e9, "quote": 300.0},
+        "fdv": 1200000,
+        "marketCap": 1100000,
+        "pairCreatedAt": 1767000000000,
+        "info": {
+            "imageUrl": logo_url,
+            "header": "https://example.invalid/header.png",
+            "openGraph": "https://example.invalid/og.png",
+            "websites": [{"label": "Website", "url": "https://example.invalid"}],
+            "socials": [{"type": "twitter", "url": "https://x.com/example"}, {"type": "telegram", "url": "https://t.me/example"}],
+        },
+    }
+
+
+def logo_png(variant, size=(512, 512)):
+    img = Image.new("RGBA", size, (40 + variant * 12, 90, 200, 255))
+    img.paste((255, 255, 255, 0), (size[0] // 4, size[1] // 4, size[0] * 3 // 4, size[1] * 3 // 4))
+    out = BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def dexscreener_app(latency=0.0, pairs_per_token=1, chains=("solana",), track_polls=False):
+    """Serves /latest/dex/tokens/{a,b,...} with a fixed latency and payload size, plus token logos.
+
+    With track_polls, stats["polls"] maps each address to the times it was requested.
+    """
+    app = web.Application()
+    stats = app["stats"] = {"requests": 0, "polls": {}}
+    logos = {}
+
+    async def tokens(request):
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        origin = f"{request.scheme}://{request.host}"
+        pairs = []
+        for address in request.match_info["addresses"].split(","):
+            if track_polls:
+                stats["polls"].setdefault(address, []).append(time.monotonic())
+            logo = f"{origin}/logos/{zlib.crc32(address.encode()) % LOGO_VARIANTS}.png"
+            for i in range(pairs_per_token):
+                pairs.append(make_pair(address, chain=chains[i % len(chains)], index=i, logo_url=logo))
+        return web.Response(text=json.dumps({"schemaVersion": "1.0.0", "pairs": pairs}), content_type="application/json")
+
+    async def logo(request):
+        variant = int(request.match_info["variant"])
+        if variant not in logos:
+            logos[variant] = logo_png(variant)
+        return web.Response(body=logos[variant], content_type="image/png")
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app.router.add_get("/latest/dex/tokens/{addresses}", tokens)
+    app.router.add_get("/logos/{variant}.png", logo)
+    app.router.add_get("/stats", get_stats)  # for stubs running in another process
+    return app
+
+
+def telegram_app(latency=0.0, flood_every=0, track_sends=False):
+    """Plays the Bot API at /bot{token}/{method}. Every flood_every-th call gets a 429.
+
+    With track_sends, stats["sends"] maps each chat id to the times messages were sent to it.
+    """
+    app = web.Application()
+    stats = app["stats"] = {"requests": 0, "methods": {}, "flooded": 0, "sends": {}}
+    message_ids = itertools.count(1)
+
+    async def method(request):
+        name = request.match_info["method"]
+        stats["requests"] += 1
+        stats["methods"][name] = stats["methods"].get(name, 0) + 1
+        data = await request.post()
+        if latency:
+            await asyncio.sleep(latency)
+        if flood_every and stats["requests"] % flood_every == 0:
+            stats["flooded"] += 1
+            return web.json_response({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                                      "parameters": {"retry_after": 1}})
+        name = name.lower()
+        if name == "getme":
+            result = {"id": 123456, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+        elif name in ("getupdates",):
+            result = []
+        elif name.startswith("send") or name.startswith("edit"):
+            chat_id = int(data.get("chat_id", 0))
+            if track_sends and name.startswith("send"):
+                stats["sends"].setdefault(chat_id, []).append(time.time())
+            result = {
+                "message_id": int(data.get("message_id") or next(message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "channel" if chat_id < 0 else "private"},
+            }
+            if "photo" in data or name == "editmessagecaption":
+                result["caption"] = data.get("caption", "")
+                result["photo"] = [{"file_id": f"FILE{result['message_id']}", "file_unique_id": f"U{result['message_id']}",
+                                    "width": 300, "height": 300}]
+            else:
+                result["text"] = data.get("text", "")
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app.router.add_post("/bot{token}/{method}", method)
+    app.router.add_get("/stats", get_stats)  # for stubs running in another process
+    return app
+
+
+def rpc_app(transfers, latency=0.0, head_block=1000):
+    """JSON-RPC batch endpoint answering EVM and Solana tx lookups.
+
+    transfers maps tx hash -> (recipient, amount in native units, succeeded[, mined_at]); unknown hashes
+    return null. EVM txs are mined at head_block - 10, in a block timestamped when it is looked up;
+    a tx with its own mined_at gets an older block of that time.
+    """
+    app = web.Application()
+    stats = app["stats"] = {"requests": 0, "calls": 0}
+
+    blocks, block_times = {}, {}  # mined_at: block number (hex), and back, for txs with their own mined_at
+
+    def block_of(mined_at):
+        if mined_at is None:
+            return hex(head_block - 10)
+        if mined_at not in blocks:
+            blocks[mined_at] = hex(head_block - 11 - len(blocks))
+            block_times[blocks[mined_at]] = mined_at
+        return blocks[mined_at]
+
+    def answer(method, params):
+        if method == "eth_blockNumber":
+            return hex(head_block)
+        if method == "eth_getBlockByNumber":
+            return {"number": params[0], "timestamp": hex(int(block_times.get(params[0], time.time())))}
+        transfer = transfers.get(params[0])
+        if transfer is None:
+            return None
+        recipient, amount, succeeded, mined_at = (*transfer, None)[:4]
+        if method == "eth_getTransactionByHash":
+            return {"hash": params[0], "to": recipient, "value": hex(int(amount * 10 ** 18))}
+        if method == "eth_getTransactionReceipt":
+            return {"transactionHash": params[0], "blockNumber": block_of(mined_at), "status": "0x1" if succeeded else "0x0"}
+        if method == "getTransaction":
+            lamports = int(amount * 10 ** 9)
+            return {
+                "blockTime": int(time.time() if mined_at is None else mined_at),
+                "transaction": {"message": {"accountKeys": ["Payer1111111111111111111111111111111111111", recipient,
+                                                            "11111111111111111111111111111111"]}},
+                "meta": {"err": None if succeeded else {"InstructionError": [0, "Custom"]},
+                         "preBalances": [lamports + 10 ** 9, 0, 1], "postBalances": [10 ** 9 - 5000, lamports, 1]},
+            }
+        raise ValueError(method)
+
+    async def rpc(request):
+        stats["requests"] += 1
+        calls = await request.json()
+        stats["calls"] += len(calls)
+        if latency:
+            await asyncio.sleep(latency)
+        return web.json_response([{"jsonrpc": "2.0", "id": c["id"], "result": answer(c["method"], c["params"])}
+                                  for c in calls])
+
+    app.router.add_post("/", rpc)
+    return app
+
+
+async def start_app(app, host="127.0.0.1", port=0):
+    """Start app on an ephemeral port; returns (runner, base_url)."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
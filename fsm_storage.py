@@ -0,0 +1,219 @@
+# fsm_storage.py
+import os
+import copy
+import json
+import time
+import asyncio
+import logging
+import typing
+from collections import OrderedDict
+from aiogram.dispatcher.storage import BaseStorage
+from store import store
+from single_flight import SingleFlight
+
+logger = logging.getLogger("fsm_storage")
+
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))          # chat/user entries kept in memory
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "1"))              # seconds a clean entry is trusted before re-reading
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.2"))  # seconds between batched writes
+FSM_STATE_TTL = float(os.getenv("FSM_STATE_TTL", str(3 * 24 * 3600)))  # untouched states are dropped after this
+FSM_EXPIRE_INTERVAL = 600
+
+
+class FSMEntry:
+    __slots__ = ("state", "data", "bucket", "updated_at", "checked_at")
+
+    def __init__(self, state=None, data=None, bucket=None, updated_at=0.0, checked_at=0.0):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.bucket = bucket if bucket is not None else {}
+        self.updated_at = updated_at  # wall clock of the last write, compared across processes
+        self.checked_at = checked_at  # monotonic time this copy was last known current
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage persisted in the SQLite store, fronted by a write-back cache.
+
+    Writes land in memory and reach the database in batches every FSM_FLUSH_INTERVAL.
+    A clean cached entry is re-read after FSM_CACHE_TTL, so processes sharing DB_PATH
+    see each other's steps; on conflicting writes the latest one wins.
+    States untouched for FSM_STATE_TTL read as empty and are deleted.
+    """
+
+    def __init__(self, cache_size=FSM_CACHE_SIZE, cache_ttl=FSM_CACHE_TTL,
+                 flush_interval=FSM_FLUSH_INTERVAL, state_ttl=FSM_STATE_TTL):
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self._cache = OrderedDict()  # (chat_id, user_id): FSMEntry
+        self._dirty = {}             # (chat_id, user_id): FSMEntry waiting to be written
+        self._loading = SingleFlight()  # loads shared by concurrent reads of one (chat_id, user_id)
+        self._flusher = None
+        self._expired_at = 0.0
+        self.hits = 0
+        self.loads = 0
+        self.flushed = 0
+
+    # ---------------- Cache ---------------- #
+    def _key(self, chat, user):
+        chat_id, user_id = self.check_address(chat=chat, user=user)
+        return str(chat_id), str(user_id)
+
+    def _remember(self, key, entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)  # dirty entries stay reachable through _dirty
+
+    async def _entry(self, chat, user):
+        key = self._key(chat, user)
+        entry = self._dirty.get(key) or self._cache.get(key)
+        now = time.monotonic()
+        if entry is not None and (key in self._dirty or now - entry.checked_at < self.cache_ttl):
+            self.hits += 1
+            self._remember(key, entry)
+            return key, entry
+
+        if key not in self._loading:
+            self.loads += 1
+        return key, await self._loading.run(key, lambda: self._load(key))
+
+    async def _load(self, key):
+        row = await asyncio.to_thread(store.load_fsm_state, *key)
+        entry = self._dirty.get(key)  # written while we were reading
+        if entry is None:
+            entry = FSMEntry(checked_at=time.monotonic())
+            if row is not None and row[3] > time.time() - self.state_ttl:
+                entry.state, entry.updated_at = row[0], row[3]
+                entry.data, entry.bucket = json.loads(row[1]), json.loads(row[2])
+        self._remember(key, entry)
+        return entry
+
+    def _touch(self, key, entry):
+        entry.updated_at = time.time()
+        entry.checked_at = time.monotonic()
+        self._dirty[key] = entry
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    # ---------------- Write-back ---------------- #
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write dirty entries in one transaction and expire stale states every FSM_EXPIRE_INTERVAL."""
+        if self._dirty:
+            dirty, self._dirty = self._dirty, {}
+            rows = [
+                (chat_id, user_id, e.state, json.dumps(e.data), json.dumps(e.bucket), e.updated_at)
+                for (chat_id, user_id), e in dirty.items()
+            ]
+            try:
+                await asyncio.to_thread(store.save_fsm_states, rows)
+                self.flushed += len(rows)
+            except Exception as e:
+                logger.error(f"Failed to persist {len(rows)} FSM states: {e}")
+                for key, entry in dirty.items():
+                    self._dirty.setdefault(key, entry)  # retried on the next flush
+
+        now = time.monotonic()
+        if now - self._expired_at >= FSM_EXPIRE_INTERVAL:
+            self._expired_at = now
+            try:
+                removed = await asyncio.to_thread(store.expire_fsm_states, time.time() - self.state_ttl)
+                if removed:
+                    logger.info(f"Expired {removed} stale FSM states")
+            except Exception as e:
+                logger.error(f"Failed to expire FSM states: {e}")
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    async def wait_closed(self):
+        pass
+
+    # ---------------- BaseStorage ---------------- #
+    async def get_state(self, *,
+                        chat: typing.Union[str, int, None] = None,
+                        user: typing.Union[str, int, None] = None,
+                        default: typing.Optional[str] = None) -> typing.Optional[str]:
+        _, entry = await self._entry(chat, user)
+        return entry.state if entry.state is not None else self.resolve_state(default)
+
+    async def get_data(self, *,
+                       chat: typing.Union[str, int, None] = None,
+                       user: typing.Union[str, int, None] = None,
+                       default: typing.Optional[dict] = None) -> typing.Dict:
+        _, entry = await self._entry(chat, user)
+        return copy.deepcopy(entry.data)
+
+    async def set_state(self, *,
+                        chat: typing.Union[str, int, None] = None,
+                        user: typing.Union[str, int, None] = None,
+                        state: typing.Optional[typing.AnyStr] = None):
+        key, entry = await self._entry(chat, user)
+        entry.state = self.resolve_state(state)
+        self._touch(key, entry)
+
+    async def set_data(self, *,
+                       chat: typing.Union[str, int, None] = None,
+                       user: typing.Union[str, int, None] = None,
+                       data: typing.Dict = None):
+        key, entry = await self._entry(chat, user)
+        entry.data = copy.deepcopy(data) if data else {}
+        self._touch(key, entry)
+
+    async def update_data(self, *,
+                          chat: typing.Union[str, int, None] = None,
+                          user: typing.Union[str, int, None] = None,
+                          data: typing.Dict = None, **kwargs):
+        key, entry = await self._entry(chat, user)
+        entry.data.update(copy.deepcopy(data) if data else {}, **kwargs)
+        self._touch(key, entry)
+
+    async def reset_state(self, *,
+                          chat: typing.Union[str, int, None] = None,
+                          user: typing.Union[str, int, None] = None,
+                          with_data: typing.Optional[bool] = True):
+        key, entry = await self._entry(chat, user)
+        entry.state = None
+        if with_data:
+            entry.data = {}
+        self._touch(key, entry)
+
+    def has_bucket(self):
+        return True
+
+    async def get_bucket(self, *,
+                         chat: typing.Union[str, int, None] = None,
+                         user: typing.Union[str, int, None] = None,
+                         default: typing.Optional[dict] = None) -> typing.Dict:
+        _, entry = await self._entry(chat, user)
+        return copy.deepcopy(entry.bucket)
+
+    async def set_bucket(self, *,
+                         chat: typing.Union[str, int, None] = None,
+                         user: typing.Union[str, int, None] = None,
+                         bucket: typing.Dict = None):
+        key, entry = await self._entry(chat, user)
+        entry.bucket = copy.deepcopy(bucket) if bucket else {}
+        self._touch(key, entry)
+
+    async def update_bucket(self, *,
+                            chat: typing.Union[str, int, None] = None,
+                            user: typing.Union[str, int, None] = None,
+                            bucket: typing.Dict = None, **kwargs):
+        key, entry = await self._entry(chat, user)
+        entry.bucket.update(copy.deepcopy(bucket) if bucket else {}, **kwargs)
+        self._touch(key, entry)
+
+    def stats(self):
+        return {"cached": len(self._cache), "dirty": len(self._dirty), "hits": self.hits,
+                "loads": self.loads, "flushed": self.flushed}
@@ -0,0 +1,76 @@
+# http_client.py
+import os
+import logging
+import aiohttp
+
+logger = logging.getLogger("http_client")
+
+# ---------------- Pool / Timeout Settings ---------------- #
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))                  # total open connections
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))  # per upstream host
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))            # seconds
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))   # idle keep-alive, seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "10"))
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class HttpClient:
+    """Application-wide pooled aiohttp session shared by every upstream fetch."""
+
+    def __init__(self):
+        self._session = None
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                use_dns_cache=True,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=DEFAULT_HEADERS)
+            logger.info("HTTP client pool started")
+        return self._session
+
+    async def session(self):
+        # Started in on_startup; lazily created for scripts that never run the bot
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def get_json(self, url, **kwargs):
+        """GET url and decode JSON. Returns None on non-200; raises on transport errors."""
+        session = await self.session()
+        async with session.get(url, **kwargs) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.json(content_type=None)
+
+    async def post_json(self, url, payload, **kwargs):
+        """POST payload as JSON and decode the reply. Returns None on non-200; raises on transport errors."""
+        session = await self.session()
+        async with session.post(url, json=payload, **kwargs) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.json(content_type=None)
+
+    async def get_bytes(self, url, **kwargs):
+        """GET url and return the raw body. Returns None on non-200; raises on transport errors."""
+        session = await self.session()
+        async with session.get(url, **kwargs) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.read()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP client pool closed")
+        self._session = None
+
+
+http = HttpClient()
@@ -0,0 +1,55 @@
+# leader.py
+import os
+import socket
+import asyncio
+import logging
+from store import store
+
+logger = logging.getLogger("leader")
+
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "15"))  # seconds a silent leader keeps the role
+
+
+class LeaderElection:
+    """Elects one process (sharing DB_PATH) to run singleton work such as the token monitor.
+
+    The leader renews a lease in the store every ttl/3 seconds. If it stops renewing,
+    another process takes over once the lease expires.
+    """
+
+    def __init__(self, name="monitor", ttl=LEADER_LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self._task = None
+
+    def start(self, on_elected, on_demoted):
+        self._task = asyncio.create_task(self._run(on_elected, on_demoted))
+
+    async def _run(self, on_elected, on_demoted):
+        while True:
+            try:
+                leader = await asyncio.to_thread(store.acquire_lease, self.name, self.owner, self.ttl)
+            except Exception as e:
+                logger.error(f"Lease renewal for {self.name} failed: {e}")
+                leader = False  # can't prove we still hold it
+            if leader and not self.is_leader:
+                self.is_leader = True
+                logger.info(f"{self.owner} elected leader for {self.name}")
+                await on_elected()
+            elif not leader and self.is_leader:
+                self.is_leader = False
+                logger.warning(f"{self.owner} lost leadership for {self.name}")
+                await on_demoted()
+            await asyncio.sleep(self.ttl / 3)
+
+    async def stop(self):
+        """Stop campaigning and hand the lease over immediately."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            await asyncio.to_thread(store.release_lease, self.name, self.owner)
@@ -0,0 +1,131 @@
+# live_cards.py
+import os
+import time
+import zlib
+import asyncio
+import logging
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.exceptions import MessageNotModified, BadRequest
+from store import store
+
+logger = logging.getLogger("live_cards")
+
+LIVE_CARDS = os.getenv("LIVE_CARDS", "0") == "1"                         # one self-updating post per token
+LIVE_CARD_MIN_INTERVAL = float(os.getenv("LIVE_CARD_MIN_INTERVAL", "30"))  # seconds between edits of one card
+
+
+class LiveCard:
+    __slots__ = ("chat_id", "message_id", "is_photo", "text_hash", "edited_at")
+
+    def __init__(self, chat_id, message_id, is_photo, text_hash, edited_at=0.0):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.is_photo = is_photo
+        self.text_hash = text_hash
+        self.edited_at = edited_at
+
+
+class LiveCards:
+    """Keeps one channel post per monitored token and edits it in place when its numbers change."""
+
+    def __init__(self):
+        self.cards = {}        # token_address: LiveCard
+        self._creating = set() # token_address with a first post in flight
+        self._dirty = {}       # token_address: store row, or None to delete
+        self.created = 0
+        self.edits = 0
+        self.skipped = 0
+
+    async def load(self):
+        for address, chat_id, message_id, is_photo, text_hash in await asyncio.to_thread(store.load_live_cards):
+            self.cards[address] = LiveCard(chat_id, message_id, bool(is_photo), text_hash)
+
+    def forget(self, address):
+        self.cards.pop(address, None)
+        self._dirty.pop(address, None)
+
+    async def update(self, address, pair):
+        """Post the card once, then edit it whenever the rendered text changes (at most every LIVE_CARD_MIN_INTERVAL)."""
+        import main
+        if address in self._creating:
+            return
+        card = self.cards.get(address)
+        now = time.monotonic()
+        if card is not None and now - card.edited_at < LIVE_CARD_MIN_INTERVAL:
+            return
+        text, logo_url, chart_url = main.create_professional_message(pair)
+        if not text:
+            return
+        caption = f"<b>🟢 LIVE</b>\n\n{text}"
+        text_hash = zlib.crc32(caption.encode())
+        if card is not None and card.text_hash == text_hash:
+            self.skipped += 1
+            return
+
+        kb = InlineKeyboardMarkup()
+        if chart_url:
+            kb.add(InlineKeyboardButton(text="📊 View Chart", url=chart_url))
+
+        if card is None:
+            self._creating.add(address)
+            future = await main.send_queue.submit(
+                main.CHANNEL_ID, lambda: main.send_token_card(main.CHANNEL_ID, caption, logo_url, reply_markup=kb)
+            )
+            future.add_done_callback(lambda f: self._created(address, text_hash, f))
+        else:
+            card.edited_at = now
+            card.text_hash = text_hash
+            future = await main.send_queue.submit(card.chat_id, lambda: self._edit(card, caption, kb))
+            future.add_done_callback(lambda f: self._edited(address, card, f))
+
+    async def _edit(self, card, caption, kb):
+        import main
+        try:
+            if card.is_photo:
+                return await main.bot.edit_message_caption(card.chat_id, card.message_id, caption=caption, reply_markup=kb)
+            return await main.bot.edit_message_text(caption, card.chat_id, card.message_id, reply_markup=kb)
+        except MessageNotModified:
+            return None
+
+    def _created(self, address, text_hash, future):
+        self._creating.discard(address)
+        if future.cancelled() or future.exception() is not None:
+            return
+        message = future.result()
+        card = self.cards[address] = LiveCard(message.chat.id, message.message_id, bool(message.photo), text_hash,
+                                              time.monotonic())
+        self._dirty[address] = (address, card.chat_id, card.message_id, int(card.is_photo), text_hash)
+        self.created += 1
+
+    def _edited(self, address, card, future):
+        if future.cancelled():
+            card.text_hash = None
+            return
+        error = future.exception()
+        if error is None:
+            self.edits += 1
+            self._dirty[address] = (address, card.chat_id, card.message_id, int(card.is_photo), card.text_hash)
+        elif isinstance(error, BadRequest):
+            # Deleted or no longer editable: post a fresh card next time
+            logger.warning(f"Live card for {address} can't be edited ({error}); reposting")
+            self.cards.pop(address, None)
+            self._dirty[address] = None
+        else:
+            card.text_hash = None  # retry on the next sweep
+
+    async def flush(self):
+        """Persist card changes collected during a sweep."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        rows = [row for row in dirty.values() if row is not None]
+        deleted = [address for address, row in dirty.items() if row is None]
+        try:
+            await asyncio.to_thread(store.save_live_cards, rows)
+            for address in deleted:
+                await asyncio.to_thread(store.delete_live_card, address)
+        except Exception as e:
+            logger.error(f"Failed to persist live cards: {e}")
+
+    def stats(self):
+        return {"cards": len(self.cards), "created": self.created, "edits": self.edits, "skipped": self.skipped}
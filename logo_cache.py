@@ -0,0 +1,204 @@
+# logo_cache.py
+import os
+import asyncio
+import hashlib
+import logging
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from single_flight import SingleFlight
+
+logger = logging.getLogger("logo_cache")
+
+LOGO_CACHE_DIR = os.getenv("LOGO_CACHE_DIR", ".logo_cache")
+LOGO_CACHE_MAX_ITEMS = int(os.getenv("LOGO_CACHE_MAX_ITEMS", "256"))  # rendered PNGs kept in memory
+LOGO_WORKERS = int(os.getenv("LOGO_WORKERS", "2"))                    # threads for decode/resize/encode
+LOGO_DISK_MAX_BYTES = int(os.getenv("LOGO_DISK_MAX_BYTES", str(256 * 2 ** 20)))  # least recently used files go beyond this
+LOGO_FILE_IDS_MAX = int(os.getenv("LOGO_FILE_IDS_MAX", "4096"))       # file_id lookups kept in memory
+PRUNE_EVERY = 64                                                      # rendered logos written between disk prunes
+
+
+def render_logo(img_bytes, size):
+    """Decode, flatten onto white, pad to a square and thumbnail. CPU-bound; runs in the worker pool."""
+    img = Image.open(BytesIO(img_bytes))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P': img = img.convert('RGBA')
+        if img.mode in ('RGBA', 'LA'): background.paste(img, mask=img.split()[-1])
+        else: background.paste(img)
+        img = background
+    max_dim = max(img.size)
+    square_img = Image.new('RGB', (max_dim, max_dim), (255, 255, 255))
+    offset = ((max_dim - img.size[0]) // 2, (max_dim - img.size[1]) // 2)
+    square_img.paste(img, offset)
+    square_img.thumbnail(size, Image.Resampling.LANCZOS)
+    out = BytesIO()
+    square_img.save(out, format="PNG", quality=95)
+    return out.getvalue()
+
+
+def logo_key(url, size):
+    return hashlib.sha256(f"{url}|{size[0]}x{size[1]}".encode()).hexdigest()
+
+
+class LogoCache:
+    """Rendered logos cached in memory and on disk, plus Telegram file_ids of uploaded ones."""
+
+    def __init__(self, cache_dir=LOGO_CACHE_DIR, max_items=LOGO_CACHE_MAX_ITEMS, workers=LOGO_WORKERS,
+                 max_disk_bytes=LOGO_DISK_MAX_BYTES, max_file_ids=LOGO_FILE_IDS_MAX):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.max_file_ids = max_file_ids
+        self._memory = OrderedDict()  # key: png bytes
+        self._file_ids = OrderedDict()  # key: telegram file_id (None = not uploaded yet)
+        self._writes = 0
+        self._inflight = SingleFlight()  # renders shared by concurrent callers
+        self._uploads = SingleFlight()   # first uploads to Telegram shared by concurrent senders
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="logo")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def _remember(self, key, png):
+        self._memory[key] = png
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        path = self._path(key, "png")
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            os.utime(path)  # mtime doubles as last use for pruning
+            return png
+        except OSError:
+            return None
+
+    def _prune_disk(self):
+        """Delete the least recently used files until the directory fits in max_disk_bytes."""
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.is_file():
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} cached logo files")
+
+    def _write_disk(self, key, ext, data):
+        path = self._path(key, ext)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    async def get_png(self, url, size=(300, 300)):
+        """Rendered PNG bytes for url at size, or None if the logo can't be fetched/decoded."""
+        key = logo_key(url, size)
+        png = self._memory.get(key)
+        if png is not None:
+            self._memory.move_to_end(key)
+            return png
+        return await self._inflight.run(key, lambda: self._render(key, url, size))
+
+    async def _render(self, key, url, size):
+        try:
+            png = await self._load(key, url, size)
+            if png is not None:
+                self._remember(key, png)
+            return png
+        except Exception as e:
+            logger.warning(f"Logo render failed for {url}: {e}")
+            return None
+
+    async def _load(self, key, url, size):
+        from http_client import http
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(self._executor, self._read_disk, key)
+        if png is not None:
+            return png
+        img_bytes = await http.get_bytes(url)
+        if not img_bytes:
+            return None
+        png = await loop.run_in_executor(self._executor, render_logo, img_bytes, size)
+        await loop.run_in_executor(self._executor, self._write_disk, key, "png", png)
+        if self._writes % PRUNE_EVERY == 0:
+            await loop.run_in_executor(self._executor, self._prune_disk)
+        self._writes += 1
+        return png
+
+    def _set_file_id(self, key, file_id):
+        self._file_ids[key] = file_id
+        self._file_ids.move_to_end(key)
+        while len(self._file_ids) > self.max_file_ids:
+            self._file_ids.popitem(last=False)
+
+    def _read_file_id(self, key):
+        try:
+            with open(self._path(key, "fid")) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _remove_file_id(self, key):
+        try:
+            os.remove(self._path(key, "fid"))
+        except OSError:
+            pass
+
+    async def file_id(self, url, size=(300, 300)):
+        key = logo_key(url, size)
+        if key in self._file_ids:
+            self._file_ids.move_to_end(key)
+            return self._file_ids[key]
+        file_id = await asyncio.get_running_loop().run_in_executor(self._executor, self._read_file_id, key)
+        self._set_file_id(key, file_id)
+        return file_id
+
+    async def remember_file_id(self, url, file_id, size=(300, 300)):
+        key = logo_key(url, size)
+        if self._file_ids.get(key) == file_id:
+            return
+        self._set_file_id(key, file_id)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write_disk, key, "fid", file_id.encode())
+        except OSError as e:
+            logger.warning(f"Could not persist file_id for {url}: {e}")
+
+    async def forget_file_id(self, url, size=(300, 300)):
+        key = logo_key(url, size)
+        self._set_file_id(key, None)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._remove_file_id, key)
+
+    async def upload(self, url, send, size=(300, 300)):
+        """Run send(), the first upload of url's logo, once for every concurrent sender; returns the file_id it yields.
+
+        Senders arriving while it runs get that file_id instead of uploading the same logo again.
+        """
+        async def first_upload():
+            file_id = await send()
+            if file_id:
+                await self.remember_file_id(url, file_id, size)
+            return file_id
+        return await self._uploads.run(logo_key(url, size), first_upload)
+
+
+logo_cache = LogoCache()
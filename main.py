@@ -1,22 +1,56 @@
 import os
-import aiohttp
+import sys
+import time
 import asyncio
 import logging
 import re
 from io import BytesIO
-from PIL import Image
 from aiogram import Bot, Dispatcher, types
 from aiogram.utils import executor
+from aiogram.utils.markdown import quote_html
+from aiogram.bot.api import TelegramAPIServer, TELEGRAM_PRODUCTION
+from aiogram.utils.exceptions import WrongFileIdentifier, WrongRemoteFileIdSpecified, TypeOfFileMismatch
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from datetime import datetime, timedelta
+from collections import OrderedDict
 import json
+from http_client import http
+from token_cache import token_cache
+from pairs import decode_tokens
+from pair_index import pair_index
+from logo_cache import logo_cache
+from send_queue import send_queue
+from watchlists import watchlists, WATCHLIST_MAX_TOKENS
+from aggregator import ALERT_KINDS
+from network_checker import detect_network
+from quotes import quotes
+from payments import PaymentVerifier
+from store import store
+import metrics
+from metrics import timed, FUNCTION_SECONDS, FUNCTION_ERRORS
+from fsm_storage import SQLiteStorage
+from leader import LeaderElection
+from workers import worker_pool, MONITOR_WORKERS
+from webhook import BoundedWebhookRequestHandler, WEBHOOK_MAX_CONCURRENT_UPDATES, WEBHOOK_SECRET
+
+# Run as a script, let monitor's `import main` reuse this module instead of loading a second copy
+sys.modules.setdefault("main", sys.modules[__name__])
 
 # ---------------- Load Bot Token ----------------
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 SUPPORT_CHAT = os.getenv("SUPPORT_CHAT")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")  # e.g. a local Bot API server or test stand-in
+
+# ---------------- Serving Mode ----------------
+BOT_MODE = os.getenv("BOT_MODE", "polling")          # "polling" or "webhook"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")            # public base URL Telegram posts to, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+WEBAPP_REUSE_PORT = os.getenv("WEBAPP_REUSE_PORT", "0") == "1"  # several processes share WEBAPP_PORT
 
 if not BOT_TOKEN:
     raise ValueError("❌ BOT_TOKEN environment variable not found!")
@@ -25,6 +59,9 @@ SUPPORT_IDS = [7886119612]
 CHANNEL_ID = -1003251300654
 POST_FOOTER = "\n\n🌐 DexTools Hot Pairs Bot • visibility for your token"
 
+DEXSCREENER_API = os.getenv("DEXSCREENER_API", "https://api.dexscreener.com")
+DEXSCREENER_BATCH_SIZE = 30  # max addresses per /latest/dex/tokens request
+
 logger = logging.getLogger("dextoolstrending")
 logger.setLevel(logging.INFO)
 handler = logging.StreamHandler()
@@ -66,15 +103,25 @@ NETWORK_EMOJIS = {
     "base": "🧊"
 }
 
-async def calculate_package_price(usd_amount, network):
-    prices = {"SOL": 135.0, "ETH": 3150.0, "BNB": 900.0}
-    unit = PAYMENT_UNITS.get(network, "ETH")
-    price_per_unit = prices.get(unit, 1.0)
-    return round(usd_amount / price_per_unit, 4)
+def calculate_package_price(usd_amount, network, unit_price=None):
+    """usd_amount in the network's payment unit, at unit_price or the cached quote. Never waits on the network."""
+    if unit_price is None:
+        unit_price, _ = quotes.quote(PAYMENT_UNITS.get(network, "ETH"))
+    return round(usd_amount / unit_price, 4)
 
-storage = MemoryStorage()
-bot = Bot(token=BOT_TOKEN, parse_mode=types.ParseMode.HTML)
+def pin_quote(usd_amount, network):
+    """FSM fields fixing the amount due at the current quote, so later steps can't drift."""
+    unit = PAYMENT_UNITS.get(network, "ETH")
+    unit_price, quoted_at = quotes.quote(unit)
+    return {"crypto": calculate_package_price(usd_amount, network, unit_price),
+            "quote": {"unit": unit, "usd": unit_price, "at": quoted_at}}
+
+# Conversation state survives restarts and is shared by replicas on DB_PATH; FSM_STORAGE=memory for throwaway runs
+storage = MemoryStorage() if os.getenv("FSM_STORAGE", "sqlite") == "memory" else SQLiteStorage()
+bot = Bot(token=BOT_TOKEN, parse_mode=types.ParseMode.HTML,
+          server=TelegramAPIServer.from_base(TELEGRAM_API_URL) if TELEGRAM_API_URL else TELEGRAM_PRODUCTION)
 dp = Dispatcher(bot, storage=storage)
+dp.middleware.setup(metrics.MetricsMiddleware())
 
 class UserState(StatesGroup):
     waiting_for_ca = State()
@@ -83,20 +130,48 @@ class UserState(StatesGroup):
     waiting_for_payment = State()
     waiting_for_tx_id = State()
 
+@timed(FUNCTION_SECONDS, function="fetch_token_info_raw")
 async def fetch_token_info_raw(token_address: str):
-    url = f"https://api.dexscreener.com/latest/dex/tokens/{token_address}"
-    headers = {"User-Agent": "Mozilla/5.0"}
+    """Cached lookup; concurrent calls for the same CA share one request."""
+    return await token_cache.get_or_fetch(token_address, fetch_token_info_uncached)
+
+async def fetch_token_info_uncached(token_address: str):
+    """{chain: PairRecord} for one CA ({} if DexScreener has no pairs), None on errors."""
     try:
-        async with aiohttp.ClientSession(headers=headers) as session:
-            async with session.get(url, timeout=10) as response:
-                return await response.json() if response.status == 200 else None
-    except: return None
+        chains = decode_tokens(await fetch_body(token_address), [token_address]).get(token_address, {})
+    except Exception:
+        FUNCTION_ERRORS.inc(function="dexscreener_request")
+        return None
+    pair_index.update(token_address, chains)
+    return chains
+
+@timed(FUNCTION_SECONDS, function="dexscreener_request")
+async def fetch_body(addresses: str):
+    body = await http.get_bytes(f"{DEXSCREENER_API}/latest/dex/tokens/{addresses}")
+    if body is None:
+        raise RuntimeError("DexScreener lookup failed")
+    return body
+
+async def fetch_tokens_batch_raw(token_addresses):
+    """Fetch up to DEXSCREENER_BATCH_SIZE tokens in one multi-address request: {address: {chain: PairRecord}}."""
+    batch = token_addresses[:DEXSCREENER_BATCH_SIZE]
+    try:
+        decoded = decode_tokens(await fetch_body(",".join(batch)), batch)
+    except Exception:
+        FUNCTION_ERRORS.inc(function="dexscreener_request")
+        return None
+    pair_index.update_many(decoded)
+    return decoded
+
+def select_best_pair(raw, chain_id: str):
+    return raw.get(chain_id) if raw else None
 
 async def fetch_token_info(chain_id: str, token_address: str):
-    raw = await fetch_token_info_raw(token_address)
-    if not raw or 'pairs' not in raw: return None
-    pairs = [p for p in raw['pairs'] if chain_id.lower() in str(p.get('chainId','')).lower()]
-    return max(pairs, key=lambda x: float(x.get('liquidity',{}).get('usd',0) or 0)) if pairs else None
+    """Best pair of a CA on chain_id; tokens the monitor polls are answered from the pair index."""
+    pair = pair_index.get(chain_id, token_address)
+    if pair is not None:
+        return pair
+    return select_best_pair(await fetch_token_info_raw(token_address), chain_id)
 
 def format_number(num):
     try:
@@ -114,75 +189,70 @@ def format_percentage(num):
         else: return f"⚪ {num:.2f}%"
     except: return "⚪ N/A"
 
+@timed(FUNCTION_SECONDS, function="resize_image")
 async def resize_image(url, size=(300,300)):
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as resp:
-                if resp.status != 200: return None
-                img_bytes = await resp.read()
-                img = Image.open(BytesIO(img_bytes))
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P': img = img.convert('RGBA')
-                    if img.mode in ('RGBA', 'LA'): background.paste(img, mask=img.split()[-1])
-                    else: background.paste(img)
-                    img = background
-                max_dim = max(img.size)
-                square_img = Image.new('RGB', (max_dim, max_dim), (255, 255, 255))
-                offset = ((max_dim - img.size[0]) // 2, (max_dim - img.size[1]) // 2)
-                square_img.paste(img, offset)
-                square_img.thumbnail(size, Image.Resampling.LANCZOS)
-                bio = BytesIO()
-                bio.name = "logo.png"
-                square_img.save(bio, format="PNG", quality=95)
-                bio.seek(0)
-                return bio
-    except: return None
-
-def create_professional_message(pair_data):
-    if not pair_data:
-        return None, None, None
-    base_token = pair_data.get('baseToken',{})
-    price_usd = pair_data.get('priceUsd','N/A')
-    price_change_h24 = pair_data.get('priceChange',{}).get('h24',0)
-    price_change_h6 = pair_data.get('priceChange',{}).get('h6',0)
-    price_change_h1 = pair_data.get('priceChange',{}).get('h1',0)
-    volume_24h = pair_data.get('volume',{}).get('h24',0)
-    liquidity = pair_data.get('liquidity',{}).get('usd',0)
-    fdv = pair_data.get('fdv',0)
-    market_cap = pair_data.get('marketCap',0)
-    pair_chain = pair_data.get('chainId','Unknown')
-    dex_name = pair_data.get('dexId','Unknown')
-    pair_address = pair_data.get('pairAddress','')
-    logo_url = pair_data.get('info', {}).get('imageUrl') or base_token.get('imageUrl')
-    
-    info = pair_data.get('info', {})
-    social_links = info.get('socials', [])
-    websites = info.get('websites', [])
-    tg_link = ""
-    tw_link = ""
-    web_link = ""
-    for site in websites:
-        url = site.get('url')
-        if url: web_link = url
-    for social in social_links:
-        s_type = social.get('type', '').lower()
-        url = social.get('url')
-        if not url: continue
-        if 'telegram' in s_type or 't.me' in url: tg_link = url
-        elif 'twitter' in s_type or 'x.com' in url: tw_link = url
+        png = await logo_cache.get_png(url, size)
+        if not png:
+            FUNCTION_ERRORS.inc(function="resize_image")
+            return None
+        bio = BytesIO(png)
+        bio.name = "logo.png"
+        return bio
+    except Exception:
+        FUNCTION_ERRORS.inc(function="resize_image")
+        return None
+
+async def send_token_card(chat_id, caption, logo_url=None, reply_markup=None):
+    """Send a card as a logo photo (uploaded once, then reusing Telegram's file_id), else as text."""
+    if logo_url:
+        file_id = await logo_cache.file_id(logo_url)
+        if file_id:
+            try:
+                return await bot.send_photo(chat_id, photo=file_id, caption=caption, reply_markup=reply_markup)
+            except (WrongFileIdentifier, WrongRemoteFileIdSpecified, TypeOfFileMismatch):
+                await logo_cache.forget_file_id(logo_url)  # Telegram no longer knows the file; other errors aren't about it
 
-    try:
-        price_float = float(price_usd)
-        if price_float < 0.000001: price_display = f"${price_float:.10f}"
-        elif price_float < 0.01: price_display = f"${price_float:.8f}"
-        else: price_display = f"${price_float:.6f}"
-    except: price_display = "N/A"
+        sent, uploading = None, False
 
+        async def upload():
+            nonlocal sent, uploading
+            uploading = True
+            img = await resize_image(logo_url)
+            if not img:
+                return None
+            sent = await bot.send_photo(chat_id, photo=img, caption=caption, reply_markup=reply_markup)
+            return sent.photo[-1].file_id if sent.photo else None
+
+        try:
+            file_id = await logo_cache.upload(logo_url, upload)
+        except Exception:
+            if uploading:
+                raise
+            # The upload we waited for failed for its own chat: upload here instead
+            file_id = await logo_cache.upload(logo_url, upload)
+        if sent is not None:
+            return sent
+        if file_id:
+            return await bot.send_photo(chat_id, photo=file_id, caption=caption, reply_markup=reply_markup)
+    return await bot.send_message(chat_id, caption, reply_markup=reply_markup)
+
+CARD_STATIC_CACHE_SIZE = 2048
+_card_static = OrderedDict()  # (chain, pair, symbol, name, links): (head, tail)
+
+def render_card_static(pair):
+    """Header and contract sections of a card; they only change with the token's identity/socials."""
+    tg_link, tw_link, web_link = pair.telegram, pair.twitter, pair.website
+    key = (pair.chain, pair.pair_address, pair.base_symbol, pair.base_name, tg_link, tw_link, web_link)
+    cached = _card_static.get(key)
+    if cached:
+        _card_static.move_to_end(key)
+        return cached
+
+    pair_chain = pair.chain
+    symbol = pair.base_symbol
     network_emoji = NETWORK_EMOJIS.get(str(pair_chain).lower(),"🔗")
-    symbol = base_token.get('symbol','Unknown')
-    name = base_token.get('name','Unknown')
-    display_name = name
+    display_name = pair.base_name
     if tg_link: display_name = f"<a href='{tg_link}'>{display_name}</a>"
     social_row = ""
     if tw_link or web_link:
@@ -191,37 +261,62 @@ def create_professional_message(pair_data):
         if web_link: links.append(f"<a href='{web_link}'>Website</a>")
         social_row = " | ".join(links) + "\n\n"
 
-    message = (
+    head = (
         f"╔══════════════════════════╗\n"
         f"     <b>🎯 TOKEN ANALYTICS</b>\n"
         f"╚══════════════════════════╝\n\n"
         f"{network_emoji} <b>{symbol}</b> • {display_name}\n"
         f"{social_row}"
-        f"🏦 <b>DEX:</b> {dex_name.upper()}\n"
+        f"🏦 <b>DEX:</b> {pair.dex.upper()}\n"
         f"⛓️ <b>Chain:</b> {pair_chain.upper()}\n\n"
+    )
+    tail = (
+        f"┏━━━━━━━━━━━━━━━━━━━━━━━━┓\n"
+        f"┃  <b>📝 CONTRACT INFO</b>       ┃\n"
+        f"┗━━━━━━━━━━━━━━━━━━━━━━━━┛\n"
+        f"<code>{pair.base_address}</code>\n"
+        f"{POST_FOOTER}"
+    )
+    _card_static[key] = (head, tail)
+    if len(_card_static) > CARD_STATIC_CACHE_SIZE:
+        _card_static.popitem(last=False)
+    return head, tail
+
+def render_card_numbers(pair):
+    """Price and market sections of a card, rebuilt on every render."""
+    price_float = pair.price_usd
+    if price_float is None: price_display = "N/A"
+    elif price_float < 0.000001: price_display = f"${price_float:.10f}"
+    elif price_float < 0.01: price_display = f"${price_float:.8f}"
+    else: price_display = f"${price_float:.6f}"
+
+    return (
         f"┏━━━━━━━━━━━━━━━━━━━━━━━━┓\n"
         f"┃  <b>💰 PRICE INFORMATION</b>   ┃\n"
         f"┗━━━━━━━━━━━━━━━━━━━━━━━━┛\n"
         f"💵 <b>Current Price:</b> {price_display}\n\n"
         f"📊 <b>Price Changes:</b>\n"
-        f"  • 1H:  {format_percentage(price_change_h1)}\n"
-        f"  • 6H:  {format_percentage(price_change_h6)}\n"
-        f"  • 24H: {format_percentage(price_change_h24)}\n\n"
+        f"  • 1H:  {format_percentage(pair.change_h1)}\n"
+        f"  • 6H:  {format_percentage(pair.change_h6)}\n"
+        f"  • 24H: {format_percentage(pair.change_h24)}\n\n"
         f"┏━━━━━━━━━━━━━━━━━━━━━━━━┓\n"
         f"┃  <b>📈 MARKET STATISTICS</b>   ┃\n"
         f"┗━━━━━━━━━━━━━━━━━━━━━━━━┛\n"
-        f"💎 <b>Market Cap:</b> {format_number(market_cap)}\n"
-        f"🌊 <b>Liquidity:</b> {format_number(liquidity)}\n"
-        f"📊 <b>24h Volume:</b> {format_number(volume_24h)}\n"
-        f"💹 <b>FDV:</b> {format_number(fdv)}\n\n"
-        f"┏━━━━━━━━━━━━━━━━━━━━━━━━┓\n"
-        f"┃  <b>📝 CONTRACT INFO</b>       ┃\n"
-        f"┗━━━━━━━━━━━━━━━━━━━━━━━━┛\n"
-        f"<code>{base_token.get('address','N/A')}</code>\n"
-        f"{POST_FOOTER}"
+        f"💎 <b>Market Cap:</b> {format_number(pair.market_cap)}\n"
+        f"🌊 <b>Liquidity:</b> {format_number(pair.liquidity_usd)}\n"
+        f"📊 <b>24h Volume:</b> {format_number(pair.volume_h24)}\n"
+        f"💹 <b>FDV:</b> {format_number(pair.fdv)}\n\n"
     )
-    chart_url = f"https://dexscreener.com/{pair_chain}/{pair_address}" if pair_address else None
-    return message, logo_url, chart_url
+
+@timed(FUNCTION_SECONDS, FUNCTION_ERRORS, function="create_professional_message")
+def create_professional_message(pair):
+    """Card text, logo URL and chart URL for a PairRecord."""
+    if not pair:
+        return None, None, None
+    head, tail = render_card_static(pair)
+    message = head + render_card_numbers(pair) + tail
+    chart_url = f"https://dexscreener.com/{pair.chain}/{pair.pair_address}" if pair.pair_address else None
+    return message, pair.logo_url, chart_url
 
 @dp.message_handler(commands=['start'], state='*')
 async def start_cmd(message: types.Message, state: FSMContext):
@@ -231,6 +326,67 @@ async def start_cmd(message: types.Message, state: FSMContext):
     kb.add(InlineKeyboardButton(text="🛠️ Support", callback_data="support"))
     await message.answer("╔══════════════════════════╗\n  <b>🌟 DEXTOOLS HOT PAIRS BOT 🌟</b>\n╚══════════════════════════╝\n\nSelect a service below:", reply_markup=kb)
 
+WATCH_USAGE = (
+    "👀 <b>Watchlist</b>\n"
+    "/watch &lt;CA&gt; [pump] [dump] [buy] — alerts for a live Hot Pairs token in this chat (default: all)\n"
+    "/unwatch &lt;CA&gt; — stop them\n"
+    "/watchlist — tokens this chat watches"
+)
+
+async def can_manage_watchlist(message: types.Message):
+    """Anyone in a private chat; only admins in groups and channels."""
+    if message.chat.type == types.ChatType.PRIVATE:
+        return True
+    member = await bot.get_chat_member(message.chat.id, message.from_user.id)
+    return member.is_chat_admin()
+
+@dp.message_handler(commands=['watch'], state='*')
+async def watch_cmd(message: types.Message):
+    args = message.get_args().split()
+    if not args:
+        await message.answer(WATCH_USAGE)
+        return
+    if not await can_manage_watchlist(message):
+        await message.answer("❌ Only chat admins can change this chat's watchlist.")
+        return
+    kinds = [k.lower() for k in args[1:]] or list(ALERT_KINDS)
+    unknown = [k for k in kinds if k not in ALERT_KINDS]
+    if unknown:
+        await message.answer(f"❌ Unknown alert type: {', '.join(unknown)}. Use {', '.join(ALERT_KINDS)}.")
+        return
+    address = await asyncio.to_thread(store.active_address, args[0])
+    if address is None:
+        await message.answer("❌ This token is not live on Hot Pairs right now.")
+        return
+    if not await watchlists.subscribe(message.chat.id, address, kinds):
+        await message.answer(f"❌ This chat already watches {WATCHLIST_MAX_TOKENS} tokens. /unwatch one first.")
+        return
+    await message.answer(f"👀 Watching <code>{address}</code> for {', '.join(kinds)} alerts.")
+
+@dp.message_handler(commands=['unwatch'], state='*')
+async def unwatch_cmd(message: types.Message):
+    args = message.get_args().split()
+    if not args:
+        await message.answer(WATCH_USAGE)
+        return
+    if not await can_manage_watchlist(message):
+        await message.answer("❌ Only chat admins can change this chat's watchlist.")
+        return
+    address = await asyncio.to_thread(store.active_address, args[0]) or args[0]
+    if await watchlists.unsubscribe(message.chat.id, address):
+        await message.answer(f"🔕 Stopped watching <code>{address}</code>.")
+    else:
+        await message.answer("❌ This chat doesn't watch that token.")
+
+@dp.message_handler(commands=['watchlist'], state='*')
+async def watchlist_cmd(message: types.Message):
+    rows = await asyncio.to_thread(store.chat_subscriptions, message.chat.id)
+    if not rows:
+        await message.answer(WATCH_USAGE)
+        return
+    lines = [f"• <code>{address}</code> — {kinds.replace(',', ', ')}" for address, kinds in rows]
+    await message.answer("👀 <b>Watched tokens</b>\n" + "\n".join(lines))
+
 @dp.callback_query_handler(lambda c: c.data == "get_hot_pairs", state='*')
 async def select_network(c: types.CallbackQuery):
     kb = InlineKeyboardMarkup(row_width=2)
@@ -249,7 +405,7 @@ async def select_duration(c: types.CallbackQuery, state: FSMContext):
     await state.update_data(network=net)
     kb = InlineKeyboardMarkup()
     for dur, usd in HOT_PAIRS_BASE_USD.items():
-        crypto = await calculate_package_price(usd, net)
+        crypto = calculate_package_price(usd, net)
         unit = PAYMENT_UNITS.get(net, "ETH")
         kb.add(InlineKeyboardButton(text=f"{dur} - ${usd} ({crypto} {unit})", callback_data=f"dur_{dur}"))
     kb.add(InlineKeyboardButton(text="🔙 Back", callback_data="get_hot_pairs"))
@@ -262,8 +418,7 @@ async def ask_ca(c: types.CallbackQuery, state: FSMContext):
     data = await state.get_data()
     net = data['network']
     usd = HOT_PAIRS_BASE_USD[dur]
-    crypto = await calculate_package_price(usd, net)
-    await state.update_data(duration=dur, usd=usd, crypto=crypto)
+    await state.update_data(duration=dur, usd=usd, **pin_quote(usd, net))
     await UserState.waiting_for_ca.set()
     await c.message.edit_text(f"✅ Selected {dur} for {net.upper()}.\n\nPlease send the <b>Contract Address (CA)</b>:")
 
@@ -273,25 +428,28 @@ async def handle_ca(message: types.Message, state: FSMContext):
     data = await state.get_data()
     net = data['network']
     pair = await fetch_token_info(CHAIN_IDS.get(net, net), ca)
+    switched_note = ""
+    raw = None if pair else await fetch_token_info_raw(ca)
+    if not pair and raw:
+        # Wrong network picked? Detect the real one from the same (cached) response.
+        detected = await detect_network(ca, list(CHAIN_IDS), pairs=[{"chainId": chain} for chain in raw])
+        if detected and detected != net:
+            pair = select_best_pair(raw, CHAIN_IDS.get(detected, detected))
+            if pair:
+                await state.update_data(network=detected, **pin_quote(data['usd'], detected))
+                switched_note = f"ℹ️ This token is on <b>{detected.upper()}</b>, not {net.upper()} — network updated.\n\n"
     if not pair:
         await message.answer("❌ Token not found. Check CA and network.")
         return
     
-    await state.update_data(ca=ca, pair_data=pair)
+    await state.update_data(ca=ca, pair_data=pair.to_dict())
     msg, logo_url, chart_url = create_professional_message(pair)
     
     kb = InlineKeyboardMarkup()
     kb.add(InlineKeyboardButton(text="✅ Confirm & Activate", callback_data="confirm_project"))
     kb.add(InlineKeyboardButton(text="❌ Cancel", callback_data="get_hot_pairs"))
 
-    if logo_url:
-        img = await resize_image(logo_url)
-        if img:
-            await message.answer_photo(photo=img, caption=f"🔍 <b>Please confirm this is your project:</b>\n\n{msg}", reply_markup=kb)
-        else:
-            await message.answer(f"🔍 <b>Please confirm this is your project:</b>\n\n{msg}", reply_markup=kb)
-    else:
-        await message.answer(f"🔍 <b>Please confirm this is your project:</b>\n\n{msg}", reply_markup=kb)
+    await send_token_card(message.chat.id, f"{switched_note}🔍 <b>Please confirm this is your project:</b>\n\n{msg}", logo_url, reply_markup=kb)
     
     await UserState.waiting_for_confirmation.set()
 
@@ -314,6 +472,8 @@ async def handle_confirmation(c: types.CallbackQuery, state: FSMContext):
     kb = InlineKeyboardMarkup()
     kb.add(InlineKeyboardButton(text="✅ Paid", callback_data="paid"))
     await c.message.answer(pay_msg, reply_markup=kb)
+    # Payments mined before this moment can't be for this order
+    await state.update_data(shown_at=time.time())
     await UserState.waiting_for_payment.set()
 
 @dp.callback_query_handler(lambda c: c.data == "paid", state=UserState.waiting_for_payment)
@@ -323,75 +483,113 @@ async def ask_tx(c: types.CallbackQuery):
 
 @dp.message_handler(state=UserState.waiting_for_tx_id)
 async def handle_tx(message: types.Message, state: FSMContext):
-    tx = message.text.strip()
     data = await state.get_data()
-    user_info = f"👤 User: {message.from_user.full_name} (@{message.from_user.username})\n🆔 ID: {message.from_user.id}"
-    
-    admin_msg = (
-        f"🔔 <b>NEW PAYMENT SUBMITTED</b>\n\n"
-        f"{user_info}\n\n"
-        f"🔥 <b>Service:</b> Hot Pairs ({data['duration']})\n"
-        f"⛓️ <b>Network:</b> {data['network'].upper()}\n"
-        f"💰 <b>Amount:</b> {data['crypto']} {PAYMENT_UNITS.get(data['network'])}\n"
-        f"📝 <b>CA:</b> {data['ca']}\n"
-        f"🔗 <b>TX ID:</b> {tx}"
+    net = data['network']
+    tx = payment_verifier.parse_tx_hash(net, message.text)
+    if not tx:
+        await message.answer(f"❌ That doesn't look like a {net.upper()} transaction hash. Please send the hash or explorer link:")
+        return
+
+    order_id = await asyncio.to_thread(store.create_order, {
+        "user_id": message.from_user.id,
+        "user_name": f"{message.from_user.full_name} (@{message.from_user.username})",
+        "address": data['ca'],
+        "network": net,
+        "duration": data['duration'],
+        "usd": data['usd'],
+        "amount": data['crypto'],
+        "unit": PAYMENT_UNITS.get(net),
+        "wallet": PAYMENT_WALLETS.get(net),
+        "tx_hash": tx,
+        "shown_at": data.get('shown_at'),
+    })
+    if order_id is None:
+        await message.answer("❌ This transaction was already submitted. Contact support if you think this is a mistake.")
+        return
+
+    payment_verifier.wake()
+    await message.answer("⏳ <b>Payment Submitted!</b>\nWe're verifying your transaction on-chain. Your token will be activated automatically once it's confirmed.")
+    await state.finish()
+
+def order_summary(order):
+    # Names, addresses and unverified tx ids are user input: escape them for HTML parse mode
+    return (
+        f"👤 User: {quote_html(order['user_name'])}\n🆔 ID: {order['user_id']}\n\n"
+        f"🔥 <b>Service:</b> Hot Pairs ({order['duration']})\n"
+        f"⛓️ <b>Network:</b> {order['network'].upper()}\n"
+        f"💰 <b>Amount:</b> {order['amount']} {order['unit']}\n"
+        f"📝 <b>CA:</b> {quote_html(order['address'])}\n"
+        f"🔗 <b>TX ID:</b> {quote_html(order['tx_hash'])}\n"
+        f"🧾 <b>Order:</b> #{order['id']}"
     )
-    
+
+async def activate_order(order):
+    """Start monitoring the order's token, announce it in the channel and tell the buyer. False if the token can't be found."""
+    net, ca = order['network'], order['address']
+    pair = await fetch_token_info(CHAIN_IDS.get(net, net), ca)
+    if not pair:
+        return False
+
+    msg, logo_url, chart_url = create_professional_message(pair)
     kb = InlineKeyboardMarkup()
-    kb.add(InlineKeyboardButton(text="✅ Activate Now", callback_data=f"admin_activate_{message.from_user.id}"))
-    
+    if chart_url:
+        kb.add(InlineKeyboardButton(text="📊 View Chart", url=chart_url))
+    await send_queue.send(CHANNEL_ID, lambda: send_token_card(CHANNEL_ID, msg, logo_url, reply_markup=kb))
+    # Only once it's announced: a failed post sends the order back for review with nothing live yet
+    await tracker.add_token(ca, net, order['duration'])
+
+    user_id = order['user_id']
+    await send_queue.submit(user_id, lambda: bot.send_message(user_id, "✅ <b>Payment Verified!</b>\nYour token is now live on Hot Pairs! 🚀"))
+    return True
+
+async def escalate_order(order, reason):
+    """Ask the admins to look at a payment the verifier couldn't settle."""
+    admin_msg = f"🔔 <b>PAYMENT NEEDS REVIEW</b>\n\n⚠️ <b>Reason:</b> {quote_html(reason)}\n\n{order_summary(order)}"
+    kb = InlineKeyboardMarkup()
+    kb.add(InlineKeyboardButton(text="✅ Activate Now", callback_data=f"admin_activate_{order['id']}"))
+    kb.add(InlineKeyboardButton(text="❌ Reject", callback_data=f"admin_reject_{order['id']}"))
     for admin_id in SUPPORT_IDS:
-        try:
-            await bot.send_message(admin_id, admin_msg, reply_markup=kb)
-        except: pass
-        
-    await message.answer("⏳ <b>Payment Submitted!</b>\nAdmin is verifying your payment. Your token will be activated shortly.")
-    await state.finish()
+        await send_queue.submit(admin_id, lambda admin_id=admin_id: bot.send_message(admin_id, admin_msg, reply_markup=kb))
+
+payment_verifier = PaymentVerifier(activate=activate_order, escalate=escalate_order)
 
 @dp.callback_query_handler(lambda c: c.data.startswith("admin_activate_"), state='*')
 async def admin_activate(c: types.CallbackQuery):
     try:
-        user_id = int(c.data.split("_")[2])
-        msg_text = c.message.text or c.message.caption or ""
-        
-        # Simple extraction using fixed prefixes
-        ca = None
-        net = None
-        pair = None
-        
-        for line in msg_text.split('\n'):
-            if "CA:" in line:
-                ca = line.split("CA:")[1].strip()
-            if "Network:" in line:
-                net = line.split("Network:")[1].strip().lower()
-                
-        if ca and net:
-            await monitor.add_token(ca) # Start monitoring the token when activated
-            pair = await fetch_token_info(CHAIN_IDS.get(net, net), ca)
-        
-        if pair:
-            msg, logo_url, chart_url = create_professional_message(pair)
-            kb = InlineKeyboardMarkup()
-            if chart_url:
-                kb.add(InlineKeyboardButton(text="📊 View Chart", url=chart_url))
-            
-            if logo_url:
-                img = await resize_image(logo_url)
-                if img: await bot.send_photo(CHANNEL_ID, photo=img, caption=msg, reply_markup=kb)
-                else: await bot.send_message(CHANNEL_ID, msg, reply_markup=kb)
-            else:
-                await bot.send_message(CHANNEL_ID, msg, reply_markup=kb)
-                
-            await c.message.edit_text(msg_text + "\n\n✅ <b>ACTIVATED!</b>")
-            try:
-                await bot.send_message(user_id, "✅ <b>Payment Verified!</b>\nYour token is now live on Hot Pairs! 🚀")
-            except: pass
+        order_id = int(c.data.split("_")[2])
+        order = await asyncio.to_thread(store.load_order, order_id)
+        if order is None:
+            await c.answer("Error: Order not found.")
+            return
+        if not await asyncio.to_thread(store.set_order_status, order_id, "activated", "activated by admin", ("pending", "escalated")):
+            await c.answer(f"Order #{order_id} is already {order['status']}.")
+            return
+        try:
+            activated = await activate_order(order)
+        except Exception:
+            # Nothing went live: hand the order back so the admin can try again
+            await asyncio.to_thread(store.set_order_status, order_id, "escalated", "activation failed", ("activated",))
+            raise
+        if activated:
+            await c.message.edit_text(c.message.html_text + "\n\n✅ <b>ACTIVATED!</b>")
         else:
+            await asyncio.to_thread(store.set_order_status, order_id, "escalated", "token info not found", ("activated",))
             await c.answer("Error: Token info not found.")
     except Exception as e:
         logger.error(f"Error in admin_activate: {e}")
         await c.answer(f"Error: {e}")
 
+@dp.callback_query_handler(lambda c: c.data.startswith("admin_reject_"), state='*')
+async def admin_reject(c: types.CallbackQuery):
+    order_id = int(c.data.split("_")[2])
+    order = await asyncio.to_thread(store.load_order, order_id)
+    if order is None or not await asyncio.to_thread(store.set_order_status, order_id, "rejected", "rejected by admin", ("pending", "escalated")):
+        await c.answer("Order already handled.")
+        return
+    user_id = order['user_id']
+    await send_queue.submit(user_id, lambda: bot.send_message(user_id, f"❌ <b>Payment not verified</b> (order #{order_id}).\nPlease contact support."))
+    await c.message.edit_text(c.message.html_text + "\n\n❌ <b>REJECTED</b>")
+
 @dp.callback_query_handler(lambda c: c.data == "support", state='*')
 async def support(c: types.CallbackQuery):
     await c.message.answer("🛠 <b>Support:</b> @DEXToolsTrend_Support")
@@ -400,12 +598,96 @@ async def support(c: types.CallbackQuery):
 async def main_menu(c: types.CallbackQuery, state: FSMContext):
     await start_cmd(c.message, state)
 
+@dp.errors_handler()
+async def count_errors(update, exception):
+    metrics.HANDLER_ERRORS.inc(error=type(exception).__name__)
+
 # Moved to avoid circular import
 from monitor import monitor
 
+metrics.Gauge("hotpairs_send_queue_depth", "Sends queued or in flight", lambda: send_queue.depth)
+metrics.Gauge("hotpairs_token_cache_entries", "Entries in the token lookup cache", lambda: token_cache.stats()["size"])
+metrics.Counter("hotpairs_token_cache_hits_total", "Token lookups served from cache", lambda: token_cache.hits)
+metrics.Counter("hotpairs_token_cache_misses_total", "Token lookups that went upstream", lambda: token_cache.misses)
+metrics.Gauge("hotpairs_pair_index_entries", "(chain, token) entries in the best-pair index", lambda: pair_index.stats()["size"])
+metrics.Counter("hotpairs_pair_index_hits_total", "Pair lookups answered from the index", lambda: pair_index.hits)
+metrics.Gauge("hotpairs_watchlist_subscriptions", "Chat subscriptions to token alerts", lambda: watchlists.stats()["subscriptions"])
+metrics.Counter("hotpairs_watchlist_deliveries_total", "Watchlist alerts delivered", lambda: watchlists.delivered)
+metrics.Gauge("hotpairs_quote_age_seconds", "Age of the oldest native-token quote", quotes.max_age)
+if isinstance(storage, SQLiteStorage):
+    metrics.Counter("hotpairs_fsm_cache_hits_total", "FSM reads served from the write-back cache", lambda: storage.hits)
+    metrics.Counter("hotpairs_fsm_loads_total", "FSM reads that went to SQLite", lambda: storage.loads)
+    metrics.Gauge("hotpairs_fsm_dirty_entries", "FSM states waiting to be flushed", lambda: storage.stats()["dirty"])
+
+# The monitor runs in this process, or sharded over MONITOR_WORKERS child processes
+tracker = worker_pool if MONITOR_WORKERS else monitor
+metrics.Gauge("hotpairs_monitored_tokens", "Tokens currently monitored",
+              lambda: worker_pool.stats()["tokens"] if MONITOR_WORKERS else len(monitor.monitored_tokens))
+metrics.Gauge("hotpairs_monitor_workers", "Monitor worker processes", lambda: len(worker_pool.workers))
+
+leader = LeaderElection("monitor")
+payments_leader = LeaderElection("payments")
+payments_task = None
+
+async def start_payments():
+    global payments_task
+    payments_task = asyncio.create_task(payment_verifier.run())
+
+async def stop_payments():
+    payment_verifier.is_running = False
+    payment_verifier.wake()
+    if payments_task is not None:
+        await payments_task
+monitor_task = None
+
+async def start_monitor():
+    global monitor_task
+    watchlists.start()  # alerts, and so watchlist fan-out, come from the monitor leader
+    monitor_task = asyncio.create_task(tracker.run())
+    logger.info(f"Monitor task created ({MONITOR_WORKERS or 'no'} worker processes)")
+
+async def stop_monitor():
+    tracker.is_running = False
+    if monitor_task is not None:
+        await monitor_task
+    await watchlists.stop()
+
 async def on_startup(dp):
-    asyncio.create_task(monitor.run())
-    logger.info("Bot started and monitor task created")
+    await http.start()
+    send_queue.start()
+    quotes.start()
+    try:
+        await metrics.start_metrics_server()
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started: {e}")
+    if BOT_MODE == "webhook":
+        # Every replica sets the same URL, so this is idempotent
+        await bot.set_webhook(WEBHOOK_URL + WEBHOOK_PATH, max_connections=WEBHOOK_MAX_CONCURRENT_UPDATES,
+                              secret_token=WEBHOOK_SECRET)
+    # Only the elected process runs the monitor, however many replicas serve updates
+    leader.start(on_elected=start_monitor, on_demoted=stop_monitor)
+    payments_leader.start(on_elected=start_payments, on_demoted=stop_payments)
+    logger.info(f"Bot started in {BOT_MODE} mode")
+
+async def on_shutdown(dp):
+    await leader.stop()
+    await stop_monitor()
+    await payments_leader.stop()
+    await stop_payments()
+    await quotes.stop()
+    await send_queue.stop()
+    await http.close()
+    logger.info("Bot stopped and HTTP pool closed")
+
+def start_webhook():
+    runner = executor.Executor(dp, skip_updates=False)
+    runner.on_startup(on_startup)
+    runner.on_shutdown(on_shutdown)
+    runner.set_webhook(webhook_path=WEBHOOK_PATH, request_handler=BoundedWebhookRequestHandler)
+    runner.run_app(host=WEBAPP_HOST, port=WEBAPP_PORT, reuse_port=WEBAPP_REUSE_PORT or None)
 
 if __name__ == "__main__":
-    executor.start_polling(dp, skip_updates=True, on_startup=on_startup)
+    if BOT_MODE == "webhook":
+        start_webhook()
+    else:
+        executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
@@ -0,0 +1,205 @@
+# metrics.py
+import os
+import time
+import asyncio
+import logging
+import functools
+from bisect import bisect_left
+from aiohttp import web
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+logger = logging.getLogger("metrics")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables the endpoint
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _label_str(key, extra=""):
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Incremented here, or a callable polled at scrape time for counts kept elsewhere."""
+    kind = "counter"
+
+    def __init__(self, name, help, function=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                yield f"{self.name} {self.function()}"
+            except Exception as e:
+                logger.warning(f"Metric {self.name} failed: {e}")
+        for key, value in self._values.items():
+            yield f"{self.name}{_label_str(key)} {value}"
+
+
+class Gauge(Counter):
+    """A set() value, or a callable polled at scrape time for state owned elsewhere."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self._values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key: [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        n = len(self.buckets)
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series[:n]):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_label_str(key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_str(key, le)} {series[-1]}"
+            yield f"{self.name}_sum{_label_str(key)} {series[-2]}"
+            yield f"{self.name}_count{_label_str(key)} {series[-1]}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def timed(histogram, errors=None, **labels):
+    """Decorator recording call latency into histogram (and failures into errors) for sync or async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    if errors is not None: errors.inc(**labels)
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start, **labels)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    if errors is not None: errors.inc(**labels)
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+# ---------------- Hot-path metrics ---------------- #
+FUNCTION_SECONDS = Histogram("hotpairs_function_seconds", "Latency of instrumented hot-path functions")
+FUNCTION_ERRORS = Counter("hotpairs_function_errors_total", "Failures (exceptions or empty results) of hot-path functions")
+UPDATE_SECONDS = Histogram("hotpairs_update_seconds", "Time to process one Telegram update")
+HANDLER_SECONDS = Histogram("hotpairs_handler_seconds", "Time spent per aiogram handler")
+HANDLER_ERRORS = Counter("hotpairs_handler_errors_total", "Exceptions raised while processing updates")
+TELEGRAM_SEND_SECONDS = Histogram("hotpairs_telegram_send_seconds", "Latency of one outbound Telegram call")
+TELEGRAM_SEND_ERRORS = Counter("hotpairs_telegram_send_errors_total", "Failed outbound Telegram calls by error type")
+SEND_QUEUE_WAIT_SECONDS = Histogram("hotpairs_send_queue_wait_seconds", "Enqueue to delivery time of queued sends",
+                                    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+SWEEP_SECONDS = Histogram("hotpairs_sweep_seconds", "Duration of one monitor poll round")
+SWEEP_TOKENS = Counter("hotpairs_sweep_tokens_total", "Tokens polled by the monitor")
+PAYMENT_ORDERS = Counter("hotpairs_payment_orders_total", "Payment orders decided, by outcome")
+PAYMENT_VERIFY_SECONDS = Histogram("hotpairs_payment_verify_seconds", "Tx submission to automatic decision",
+                                   buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800))
+PAYMENT_RPC_SECONDS = Histogram("hotpairs_payment_rpc_seconds", "Latency of one batched chain RPC call")
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Times every update and each handler that runs for it."""
+
+    async def on_pre_process_update(self, update, data):
+        data["_metrics_start"] = time.perf_counter()
+
+    async def on_post_process_update(self, update, results, data):
+        start = data.get("_metrics_start")
+        if start is not None:
+            UPDATE_SECONDS.observe(time.perf_counter() - start)
+
+    async def on_process_message(self, message, data):
+        self._handler_started(data)
+
+    async def on_post_process_message(self, message, results, data):
+        self._handler_finished(data)
+
+    async def on_process_callback_query(self, query, data):
+        self._handler_started(data)
+
+    async def on_post_process_callback_query(self, query, results, data):
+        self._handler_finished(data)
+
+    @staticmethod
+    def _handler_started(data):
+        handler = current_handler.get(None)
+        data["_metrics_handler"] = getattr(handler, "__name__", "unknown")
+        data["_metrics_handler_start"] = time.perf_counter()
+
+    @staticmethod
+    def _handler_finished(data):
+        start = data.get("_metrics_handler_start")
+        if start is not None:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, handler=data["_metrics_handler"])
+
+
+async def metrics_view(request):
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics from the bot process. Returns the runner (None when disabled)."""
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_view)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+    return runner
@@ -1,5 +1,15 @@
+import time
 import asyncio
 import logging
+from store import store
+from scheduler import PollScheduler, adaptive_interval, BASE_POLL_INTERVAL
+from aggregator import AlertAggregator
+from timeseries import RingBuffer, Sample, sample_from_pair
+from pairs import best_pair
+from pair_index import PAIR_INDEX_MAX_AGE, PAIR_INDEX_FORWARD_INTERVAL
+from metrics import SWEEP_SECONDS, SWEEP_TOKENS
+from live_cards import LiveCards, LIVE_CARDS
+from watchlists import watchlists
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 logger = logging.getLogger("token_monitor")
@@ -8,64 +18,253 @@ logger = logging.getLogger("token_monitor")
 BIG_BUY_THRESHOLD_USD = 500  # Example: $500
 PUMP_THRESHOLD_1H = 10.0      # Minimum 10% pump
 DUMP_THRESHOLD_1H = -10.0     # Minimum 10% dump
+LOCAL_MOVE_THRESHOLD = 10.0   # % away from the local moving average that also counts as pump/dump
+MA_SAMPLES = 12               # Samples in the local price moving average
+MA_MAX_AGE = 15 * 60          # Seconds; older samples (e.g. restored after downtime) don't count towards it
+MAX_CONCURRENT_BATCHES = 5    # Parallel DexScreener batch requests per sweep
+POLL_RPS_BUDGET = 3.0         # DexScreener requests/second shared by all tokens
+PIGGYBACK_WINDOW = 3.0        # Seconds early a token may ride along to fill a batch
+EXPIRY_CHECK_INTERVAL = 30    # Seconds between package-expiry scans
+
+def package_seconds(duration):
+    """'6h' -> 21600; None for unknown/unlimited packages."""
+    try:
+        return int(str(duration).lower().rstrip('h')) * 3600
+    except (TypeError, ValueError):
+        return None
+
+def snapshot_row(address, sample):
+    return (address, sample.price, sample.liquidity, sample.volume, sample.change_h1, sample.ts)
+
+def token_state(history, i):
+    """'pump', 'dump' or None for sample i, from the API 1h change and the local moving average."""
+    if i < 0:
+        i += len(history)
+    sample = history[i]
+    average = history.moving_average('price', MA_SAMPLES, end=i, since=sample.ts - MA_MAX_AGE)
+    move = (sample.price / average - 1) * 100 if average else 0.0
+    if sample.change_h1 >= PUMP_THRESHOLD_1H or move >= LOCAL_MOVE_THRESHOLD:
+        return "pump"
+    if sample.change_h1 <= DUMP_THRESHOLD_1H or move <= -LOCAL_MOVE_THRESHOLD:
+        return "dump"
+    return None
 
 class TokenMonitor:
     def __init__(self):
-        self.monitored_tokens = {} # token_address: last_data
-        self.last_buys = {}        # token_address: last_volume
+        self.monitored_tokens = {} # token_address: RingBuffer of recent samples
+        self.expires_at = {}       # token_address: unix time the package ends (absent = no limit)
+        self.scheduler = PollScheduler()
+        self.aggregator = AlertAggregator(self.post_alert)
+        self.live_cards = LiveCards()
+        self.forward = None        # async (event, **payload): set in worker processes to hand alerts to the bot
+        self._forwarded = {}       # address: (monotonic time, pair_address, price_usd) last sent to the bot's pair index
+        self._sweep_lock = asyncio.Lock()
         self.is_running = False
 
-    async def add_token(self, address):
+    def restore(self, row, due):
+        """Start tracking a token from its store row (activation plus last snapshot), first poll at due."""
+        address = row['address']
+        if address in self.monitored_tokens:
+            # Already tracked: only a renewal can have changed, and it moves the expiry
+            if row.get('expires_at'):
+                self.expires_at[address] = row['expires_at']
+            else:
+                self.expires_at.pop(address, None)
+            return False
+        history = self.monitored_tokens[address] = RingBuffer()
+        if row.get('updated_at') is not None:
+            history.append(Sample(row['updated_at'], row['price_usd'] or 0.0, row['liquidity_usd'] or 0.0,
+                                  row['volume_h24'] or 0.0, row['change_h1'] or 0.0))
+        if row.get('expires_at'):
+            self.expires_at[address] = row['expires_at']
+        self.scheduler.schedule(address, due)
+        return True
+
+    async def load(self):
+        """Restore activated tokens and their last snapshot from the store in one read.
+
+        Also picks up tokens activated by other processes sharing the store.
+        """
+        rows = await asyncio.to_thread(store.load_active)
+        now = time.monotonic()
+        restored = sum(self.restore(row, now) for row in rows)
+        if restored:
+            logger.info(f"Restored {restored} monitored tokens from store")
+
+    async def save_activation(self, address, network=None, duration=None):
+        """Persist an activation, or add it to one still running; returns when its package ends (None = no limit)."""
+        now = time.time()
+        seconds = package_seconds(duration)
+        expires_at = now + seconds if seconds else None
+        return await asyncio.to_thread(store.save_activation, address, network, duration, now, expires_at)
+
+    async def add_token(self, address, network=None, duration=None):
         import main
+        now = time.time()
+        expires_at = await self.save_activation(address, network, duration)
+        if not self.is_running:
+            return  # another replica is the monitor leader and picks it up from the store
+        if expires_at:
+            self.expires_at[address] = expires_at
+        else:
+            self.expires_at.pop(address, None)
         if address not in self.monitored_tokens:
-            data = await main.fetch_token_info_raw(address)
-            if data and 'pairs' in data and data['pairs']:
-                pair = data['pairs'][0]
-                self.monitored_tokens[address] = pair
-                # Initialize buy tracking with current 24h volume
-                self.last_buys[address] = float(pair.get('volume', {}).get('h24', 0))
-                logger.info(f"Started monitoring {address}")
-
-    async def check_tokens(self):
+            history = self.monitored_tokens[address] = RingBuffer()
+            pair = best_pair(await main.fetch_token_info_raw(address))
+            # Without data the first sweep seeds the baseline instead
+            if pair:
+                history.append(sample_from_pair(pair, now))
+                await asyncio.to_thread(store.save_snapshots, [snapshot_row(address, history.latest())])
+            self.scheduler.schedule(address, time.monotonic() + BASE_POLL_INTERVAL)
+            logger.info(f"Started monitoring {address}")
+
+    def memory_usage(self):
+        """Bytes held by per-token histories."""
+        return sum(h.nbytes() for h in self.monitored_tokens.values())
+
+    def drop(self, addresses):
+        """Stop tracking addresses in this process only; the store keeps them."""
+        for address in addresses:
+            self.monitored_tokens.pop(address, None)
+            self.expires_at.pop(address, None)
+            self.live_cards.forget(address)
+            self.scheduler.remove(address)
+            self._forwarded.pop(address, None)
+
+    async def release(self, addresses):
+        """Hand addresses over to another worker: returns once no sweep of this process can still poll them."""
+        self.drop(addresses)
+        async with self._sweep_lock:
+            pass
+
+    async def remove_tokens(self, addresses, now=None):
+        """Stop monitoring addresses whose package ended by now; returns the ones renewed meanwhile, which stay."""
+        renewed = await asyncio.to_thread(store.remove_tokens, addresses, now)
+        removed = [a for a in addresses if a not in renewed]
+        self.drop(removed)
+        watchlists.forget(removed)
+        for address, expires_at in renewed.items():
+            if expires_at:
+                self.expires_at[address] = expires_at
+            else:
+                self.expires_at.pop(address, None)
+        return renewed
+
+    async def expire_tokens(self, now=None):
+        """Stop monitoring tokens whose package has ended."""
+        now = time.time() if now is None else now
+        expired = [a for a, t in self.expires_at.items() if t <= now]
+        if expired:
+            renewed = await self.remove_tokens(expired, now)
+            expired = [a for a in expired if a not in renewed]
+        if expired:
+            logger.info(f"Package expired for {len(expired)} tokens: {', '.join(expired)}")
+            if self.forward is not None:
+                await self.forward("expired", addresses=expired)
+        return expired
+
+    async def fetch_pairs(self, addresses):
+        """Poll addresses in multi-address batches; returns {address: pair}."""
         import main
-        for address, last_pair in list(self.monitored_tokens.items()):
+        size = main.DEXSCREENER_BATCH_SIZE
+        batches = [addresses[i:i + size] for i in range(0, len(addresses), size)]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+        async def run_batch(batch):
+            async with semaphore:
+                return batch, await main.fetch_tokens_batch_raw(batch)
+
+        results = {}
+        for batch, decoded in await asyncio.gather(*(run_batch(b) for b in batches)):
+            for address, chains in (decoded or {}).items():
+                results[address] = best_pair(chains)
+                # Sweep results double as fresh lookups for handle_ca/admin_activate
+                main.token_cache.put(address, chains)
+            if decoded and self.forward is not None:
+                # Workers' sweeps feed the bot process's pair index
+                changed = self.pairs_to_forward(decoded)
+                if changed:
+                    await self.forward("pairs", pairs=changed)
+        return results
+
+    def pairs_to_forward(self, decoded):
+        """{address: best pair dict} out of a sweep for the bot process's pair index, left out where its copy will do.
+
+        A token's pair goes when it switched to another pool, when its price moved and the last update
+        is PAIR_INDEX_FORWARD_INTERVAL old, or before the index copy ages out.
+        """
+        now = time.monotonic()
+        changed = {}
+        for address, chains in decoded.items():
+            pair = best_pair(chains)
+            if pair is None:
+                continue
+            last = self._forwarded.get(address)
+            if last is not None and last[1] == pair.pair_address:
+                age = now - last[0]
+                if age < PAIR_INDEX_FORWARD_INTERVAL or (last[2] == pair.price_usd and age < PAIR_INDEX_MAX_AGE / 2):
+                    continue
+            self._forwarded[address] = (now, pair.pair_address, pair.price_usd)
+            changed[address] = pair.to_dict()
+        return changed
+
+    async def check_tokens(self, addresses=None):
+        """Poll addresses (default: every monitored token) and reschedule each by its activity."""
+        addresses = list(self.monitored_tokens) if addresses is None else addresses
+        started = time.perf_counter()
+        pairs = await self.fetch_pairs(addresses)
+        now = time.time()
+        due_base = time.monotonic()
+        for address in addresses:
+            if address in self.monitored_tokens:
+                self.scheduler.schedule(address, due_base + adaptive_interval(pairs.get(address)))
+        snapshots = []
+        for address, new_pair in pairs.items():
+            history = self.monitored_tokens.get(address)
+            if history is None:
+                continue
             try:
-                new_data = await main.fetch_token_info_raw(address)
-                if not new_data or 'pairs' not in new_data or not new_data['pairs']:
+                history.append(sample_from_pair(new_pair, now))
+                snapshots.append(snapshot_row(address, history.latest()))
+                if LIVE_CARDS:
+                    if self.forward is not None:
+                        await self.forward("live", address=address, pair=new_pair.to_dict())
+                    else:
+                        await self.live_cards.update(address, new_pair)
+                if len(history) < 2:
                     continue
-                
-                new_pair = new_data['pairs'][0]
-                
-                # Check for Pump/Dump (>= 10%)
-                change_1h = float(new_pair.get('priceChange', {}).get('h1', 0))
-                
-                if change_1h >= PUMP_THRESHOLD_1H:
-                    last_change = float(last_pair.get('priceChange', {}).get('h1', 0))
-                    if last_change < PUMP_THRESHOLD_1H:
-                        await self.post_alert(new_pair, "🚀 BIG PUMP ALERT (10%+) ")
-                
-                elif change_1h <= DUMP_THRESHOLD_1H:
-                    last_change = float(last_pair.get('priceChange', {}).get('h1', 0))
-                    if last_change > DUMP_THRESHOLD_1H:
-                        await self.post_alert(new_pair, "📉 BIG DUMP ALERT (10%+) ")
-
-                # Check for 'Buys' (Volume increases) every 10s
-                new_volume = float(new_pair.get('volume', {}).get('h24', 0))
-                last_volume = self.last_buys.get(address, 0)
-                
-                if new_volume > last_volume:
-                    diff = new_volume - last_volume
-                    await self.post_alert(new_pair, f"💰 BUY DETECTED (${diff:,.2f})")
-                
-                # Update state
-                self.monitored_tokens[address] = new_pair
-                self.last_buys[address] = new_volume
+
+                # Pump/Dump: alert on entering the state, not while staying in it (new post even with live cards)
+                state = token_state(history, -1)
+                if state and state != token_state(history, -2):
+                    await self.aggregator.record_state(address, new_pair, state)
+
+                # Check for 'Buys' (Volume increases), rolled up per alert window; live cards already show volume
+                if not LIVE_CARDS and history.delta('volume') > 0 and now - history[-2].ts <= MA_MAX_AGE:
+                    await self.aggregator.record_buy(address, new_pair, history[-2].volume, history[-1].volume)
                 
             except Exception as e:
                 logger.error(f"Error checking token {address}: {e}")
 
-    async def post_alert(self, pair_data, alert_type):
+        # One transaction per sweep
+        try:
+            await asyncio.to_thread(store.save_snapshots, snapshots)
+        except Exception as e:
+            logger.error(f"Failed to persist snapshots: {e}")
+        await self.live_cards.flush()
+        SWEEP_SECONDS.observe(time.perf_counter() - started)
+        SWEEP_TOKENS.inc(len(addresses))
+
+    async def post_alert(self, pair_data, alert_type, address=None, kinds=()):
+        """Post an alert to the channel and to the chats watching address for any of kinds."""
         import main
+        if self.forward is not None:
+            await self.forward("alert", pair=pair_data.to_dict(), label=alert_type, address=address, kinds=list(kinds))
+            return
+        # Digests hold the pair from when their window opened; render the latest sweep's numbers
+        fresh = main.pair_index.get(pair_data.chain, pair_data.base_address)
+        if fresh is not None and fresh.pair_address == pair_data.pair_address:
+            pair_data = fresh
         msg_text, logo_url, chart_url = main.create_professional_message(pair_data)
         if not msg_text: return
         
@@ -74,20 +273,54 @@ class TokenMonitor:
         if chart_url:
             kb.add(InlineKeyboardButton(text="📊 View Chart", url=chart_url))
             
-        try:
-            if logo_url:
-                img = await main.resize_image(logo_url)
-                if img:
-                    await main.bot.send_photo(main.CHANNEL_ID, photo=img, caption=full_msg, reply_markup=kb)
-                    return
-            await main.bot.send_message(main.CHANNEL_ID, full_msg, reply_markup=kb)
-        except Exception as e:
-            logger.error(f"Failed to post alert: {e}")
+        # Queued, not awaited: a full send queue blocks here and slows the sweep down
+        await main.send_queue.submit(
+            main.CHANNEL_ID, lambda: main.send_token_card(main.CHANNEL_ID, full_msg, logo_url, reply_markup=kb)
+        )
+        if address is not None:
+            watchlists.fan_out(address, kinds, full_msg, logo_url, reply_markup=kb)
 
-    async def run(self):
+    async def run(self, restore=True):
+        """Poll loop. Workers pass restore=False and get their tokens assigned instead of reading the store."""
+        import main
         self.is_running = True
+        if restore:
+            await self.load()
+            if LIVE_CARDS:
+                await self.live_cards.load()
+        aggregator_task = asyncio.create_task(self.aggregator.run())
+        batch_size = main.DEXSCREENER_BATCH_SIZE
+        budget = float(MAX_CONCURRENT_BATCHES)  # token bucket of upstream requests
+        last_refill = next_expiry_check = time.monotonic()
         while self.is_running:
-            await self.check_tokens()
-            await asyncio.sleep(10) # Check every 10 seconds
+            now = time.monotonic()
+            if now >= next_expiry_check:
+                await self.expire_tokens()
+                if restore:
+                    await self.load()  # activations saved by replicas that don't run the monitor
+                next_expiry_check = now + EXPIRY_CHECK_INTERVAL
+
+            budget = min(float(MAX_CONCURRENT_BATCHES), budget + (now - last_refill) * POLL_RPS_BUDGET)
+            last_refill = now
+            batches = int(budget)
+            due = self.scheduler.pop_due(now, batches * batch_size) if batches else []
+            if due:
+                # Top up the last batch with tokens that are due shortly anyway
+                room = -len(due) % batch_size
+                if room:
+                    due += self.scheduler.pop_due(now + PIGGYBACK_WINDOW, room)
+                budget -= -(-len(due) // batch_size)
+                async with self._sweep_lock:
+                    await self.check_tokens(due)
+                continue
+
+            next_due = self.scheduler.next_due()
+            wait = 1.0 if next_due is None else max(next_due - now, 0.0)
+            if batches == 0:
+                wait = max(wait, (1 - budget) / POLL_RPS_BUDGET)
+            await asyncio.sleep(min(wait, 1.0))
+
+        self.aggregator.is_running = False
+        await aggregator_task
 
 monitor = TokenMonitor()
@@ -0,0 +1,71 @@
+# monitor_worker.py
+# One shard of the token monitor, started by workers.WorkerPool: `python monitor_worker.py <id>`.
+# Commands arrive as JSON lines on stdin; events go back as JSON lines on stdout.
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger("monitor_worker")
+
+
+async def open_events(pipe):
+    """Non-blocking writer for the events pipe: when the bot falls behind, only the emitting task waits."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, protocol = await loop.connect_write_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return asyncio.StreamWriter(transport, protocol, reader, loop)
+
+
+async def serve(worker_id, out):
+    import main
+    from monitor import monitor
+    from workers import LINE_LIMIT
+
+    events = await open_events(out)
+
+    async def emit(event, **payload):
+        events.write(json.dumps({"event": event, **payload}).encode() + b"\n")
+        await events.drain()
+
+    monitor.forward = emit
+    await main.http.start()
+
+    reader = asyncio.StreamReader(limit=LINE_LIMIT)
+    await asyncio.get_running_loop().connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    poller = asyncio.create_task(monitor.run(restore=False))
+    await emit("ready")
+    logger.info(f"Monitor worker {worker_id} ready")
+
+    while True:
+        line = await reader.readline()
+        if not line:
+            break  # the bot process went away
+        command = json.loads(line)
+        op = command["op"]
+        if op == "assign":
+            due = time.monotonic()
+            for row in command["tokens"]:
+                monitor.restore(row, due)
+        elif op == "release":
+            await monitor.release(command["addresses"])
+            await emit("released", id=command["id"])
+        elif op == "stop":
+            break
+
+    monitor.is_running = False
+    await poller
+    await main.http.close()
+    events.close()
+    await events.wait_closed()  # flushes events still buffered
+    logger.info(f"Monitor worker {worker_id} stopped")
+
+
+if __name__ == "__main__":
+    # Events own the real stdout; anything else printed lands on stderr with the logs
+    events = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(serve(int(sys.argv[1]), events))
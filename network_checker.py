@@ -1,35 +1,37 @@
 # network_checker.py
-import json
-import urllib.request
-import urllib.error
+import os
+import logging
+from collections import OrderedDict
+from token_cache import cache_key
 
-# ---------------- DexScreener Network Detection ---------------- #
+logger = logging.getLogger("network_checker")
 
-def detect_network_from_dexscreener(ca: str, supported_networks: list[str]) -> str | None:
-    """
-    Detects which blockchain a contract belongs to using DexScreener public API.
-    Works with built-in libraries only (no aiohttp or requests needed).
+DEXSCREENER_API = os.getenv("DEXSCREENER_API", "https://api.dexscreener.com")
+NETWORK_CACHE_SIZE = int(os.getenv("NETWORK_CACHE_SIZE", "4096"))
 
-    Returns:
-        - the network name (e.g. 'bsc', 'ethereum', 'solana', etc.)
-        - None if not found
-    """
-    if not ca:
-        return None
+# CA -> detected network. A contract's chain never changes, so entries don't expire.
+_network_cache: "OrderedDict[str, str]" = OrderedDict()
 
-    url = f"https://api.dexscreener.com/latest/dex/search/?q={ca}"
-    try:
-        with urllib.request.urlopen(url, timeout=10) as resp:
-            data = json.loads(resp.read().decode())
-    except Exception as e:
-        print(f"[NetworkChecker] Error fetching DexScreener data: {e}")
-        return None
 
-    pairs = data.get("pairs") or []
-    if not pairs:
-        print("[NetworkChecker] No pairs found for CA.")
-        return None
+def cached_network(ca: str) -> str | None:
+    key = cache_key(ca)
+    network = _network_cache.get(key)
+    if network is not None:
+        _network_cache.move_to_end(key)
+    return network
+
 
+def remember_network(ca: str, network: str) -> None:
+    key = cache_key(ca)
+    _network_cache[key] = network
+    _network_cache.move_to_end(key)
+    while len(_network_cache) > NETWORK_CACHE_SIZE:
+        _network_cache.popitem(last=False)
+
+# ---------------- DexScreener Network Detection ---------------- #
+
+def match_network(pairs: list[dict], supported_networks: list[str]) -> str | None:
+    """Returns the first supported network any of the pairs belongs to."""
     supported = set(n.lower() for n in supported_networks)
     for p in pairs:
         for key in ("chainId", "chain", "chainName", "network"):
@@ -38,8 +40,48 @@ def detect_network_from_dexscreener(ca: str, supported_networks: list[str]) -> s
                 val_l = val.lower()
                 for s in supported:
                     if s in val_l or val_l in s:
-                        print(f"[NetworkChecker] Detected network: {s}")
+                        logger.debug(f"Detected network: {s}")
                         return s
 
-    print("[NetworkChecker] Could not match any supported network.")
+    logger.info("Could not match any supported network")
     return None
+
+
+async def detect_network(ca: str, supported_networks: list[str], pairs: list[dict] | None = None) -> str | None:
+    """
+    Non-blocking, cached network detection for use inside bot handlers.
+
+    Pass the pairs of a /latest/dex/tokens lookup the caller already made to detect
+    the chain without another request: the cached network is kept while they still
+    trade on it, and they win otherwise. Without pairs the cache is consulted and then
+    DexScreener search is queried through the shared HTTP pool.
+    """
+    if not ca:
+        return None
+
+    network = cached_network(ca)
+    if pairs is None:
+        if network is not None:
+            return network
+
+        from http_client import http
+
+        url = f"{DEXSCREENER_API}/latest/dex/search/?q={ca}"
+        try:
+            data = await http.get_json(url) or {}
+        except Exception as e:
+            logger.warning(f"Error fetching DexScreener data: {e}")
+            return None
+        pairs = data.get("pairs") or []
+
+    elif network is not None and any(p.get("chainId") == network for p in pairs):
+        return network  # same answer as last time for a token trading on several chains
+
+    if not pairs:
+        logger.info(f"No pairs found for {ca}")
+        return None
+
+    network = match_network(pairs, supported_networks)
+    if network is not None:
+        remember_network(ca, network)
+    return network
@@ -0,0 +1,56 @@
+# pair_index.py
+import os
+import time
+from collections import OrderedDict
+
+from token_cache import cache_key
+
+PAIR_INDEX_MAX_AGE = float(os.getenv("PAIR_INDEX_MAX_AGE", "30"))          # seconds an entry answers lookups
+PAIR_INDEX_MAX_SIZE = int(os.getenv("PAIR_INDEX_MAX_SIZE", "50000"))       # (chain, token) entries before the least recently updated go
+PAIR_INDEX_FORWARD_INTERVAL = float(os.getenv("PAIR_INDEX_FORWARD_INTERVAL", "5"))  # seconds between a worker's updates of one token's pair
+
+
+class PairIndex:
+    """Best pair per (chain, token), updated by every DexScreener response the bot decodes.
+
+    Monitor sweeps keep tracked tokens fresh, so lookups for them are answered without a request.
+    """
+
+    def __init__(self, max_age=PAIR_INDEX_MAX_AGE, max_size=PAIR_INDEX_MAX_SIZE):
+        self.max_age = max_age
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (chain, key): (updated_at, PairRecord)
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, address, chains, now=None):
+        """Replace the entries of address for each chain in {chain: PairRecord}."""
+        now = time.monotonic() if now is None else now
+        key = cache_key(address)
+        for chain, pair in chains.items():
+            entry = (chain, key)
+            self._entries[entry] = (now, pair)
+            self._entries.move_to_end(entry)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def update_many(self, decoded):
+        """Feed a whole {address: {chain: PairRecord}} batch."""
+        now = time.monotonic()
+        for address, chains in decoded.items():
+            self.update(address, chains, now)
+
+    def get(self, chain, address, max_age=None):
+        """The best pair of address on chain if it was seen within max_age seconds, else None."""
+        entry = self._entries.get((chain, cache_key(address)))
+        if entry is None or time.monotonic() - entry[0] > (self.max_age if max_age is None else max_age):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+pair_index = PairIndex()
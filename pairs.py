@@ -0,0 +1,125 @@
+# pairs.py
+# Lean decoding of DexScreener /latest/dex/tokens responses into compact pair records.
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # optional speed-up; the stdlib parser gives identical results
+    import json
+    loads = json.loads
+
+FIELDS = (
+    "chain", "dex", "pair_address", "base_address", "base_symbol", "base_name",
+    "price_usd", "change_m5", "change_h1", "change_h6", "change_h24",
+    "volume_m5", "volume_h1", "volume_h24", "liquidity_usd", "fdv", "market_cap",
+    "logo_url", "telegram", "twitter", "website",
+)
+
+
+def _num(value):
+    """float, or None when DexScreener sent something non-numeric (rendered as N/A)."""
+    try: return float(value)
+    except (TypeError, ValueError): return None
+
+
+class PairRecord:
+    """The fields of a DexScreener pair that cards, alerts and the monitor read; a few hundred bytes instead of a few KB.
+
+    Missing numbers default to 0 like the raw dict lookups did; the price has no default and
+    stays None (N/A) when absent.
+    """
+
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_json(cls, pair):
+        base = pair.get('baseToken') or {}
+        info = pair.get('info') or {}
+        change = pair.get('priceChange') or {}
+        volume = pair.get('volume') or {}
+        r = cls.__new__(cls)
+        r.chain = pair.get('chainId', 'Unknown')
+        r.dex = pair.get('dexId', 'Unknown')
+        r.pair_address = pair.get('pairAddress', '')
+        r.base_address = base.get('address', 'N/A')
+        r.base_symbol = base.get('symbol', 'Unknown')
+        r.base_name = base.get('name', 'Unknown')
+        r.price_usd = _num(pair.get('priceUsd'))
+        r.change_m5 = _num(change.get('m5', 0))
+        r.change_h1 = _num(change.get('h1', 0))
+        r.change_h6 = _num(change.get('h6', 0))
+        r.change_h24 = _num(change.get('h24', 0))
+        r.volume_m5 = _num(volume.get('m5', 0))
+        r.volume_h1 = _num(volume.get('h1', 0))
+        r.volume_h24 = _num(volume.get('h24', 0))
+        r.liquidity_usd = _num((pair.get('liquidity') or {}).get('usd', 0))
+        r.fdv = _num(pair.get('fdv', 0))
+        r.market_cap = _num(pair.get('marketCap', 0))
+        r.logo_url = info.get('imageUrl') or base.get('imageUrl')
+        r.telegram = r.twitter = r.website = ""
+        for site in info.get('websites') or ():
+            url = site.get('url')
+            if url: r.website = url
+        for social in info.get('socials') or ():
+            s_type = social.get('type', '').lower()
+            url = social.get('url')
+            if not url: continue
+            if 'telegram' in s_type or 't.me' in url: r.telegram = url
+            elif 'twitter' in s_type or 'x.com' in url: r.twitter = url
+        return r
+
+    def to_dict(self):
+        """JSON-safe form for worker IPC and FSM data."""
+        return {name: getattr(self, name) for name in FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        r = cls.__new__(cls)
+        for name in FIELDS:
+            setattr(r, name, data.get(name))
+        return r
+
+    def __repr__(self):
+        return f"PairRecord({self.chain}/{self.pair_address} {self.base_symbol} ${self.price_usd} liq={self.liquidity_usd})"
+
+
+def decode_tokens(body, addresses):
+    """{address: {chain: PairRecord}} for a /latest/dex/tokens body (bytes or str) covering addresses.
+
+    One pass keeps the most liquid pair per token and chain, and a record is only built for
+    the winners. Pairs where the token is the base side win over pairs where it is quoted;
+    those are used only for tokens with no base-side pair at all.
+    """
+    data = loads(body) if body else None
+    pairs = data.get('pairs') if isinstance(data, dict) else None
+    if not pairs:
+        return {}
+    wanted = {a.lower(): a for a in addresses}
+    base_best, quote_best = {}, {}  # address: {chain: (liquidity, pair)}
+    for pair in pairs:
+        base = wanted.get(str((pair.get('baseToken') or {}).get('address', '')).lower())
+        quote = wanted.get(str((pair.get('quoteToken') or {}).get('address', '')).lower())
+        if base is None and quote is None:
+            continue
+        chain = pair.get('chainId', 'Unknown')
+        liquidity = _num((pair.get('liquidity') or {}).get('usd') or 0) or 0.0
+        for address, best in ((base, base_best), (quote, quote_best)):
+            if address is None:
+                continue
+            chains = best.setdefault(address, {})
+            current = chains.get(chain)
+            if current is None or liquidity > current[0]:
+                chains[chain] = (liquidity, pair)
+
+    results = {}
+    for address in wanted.values():
+        chains = base_best.get(address) or quote_best.get(address)
+        if chains:
+            results[address] = {chain: PairRecord.from_json(pair) for chain, (_, pair) in chains.items()}
+    return results
+
+
+def best_pair(chains):
+    """Most liquid record across a token's chains, or None."""
+    if not chains:
+        return None
+    return max(chains.values(), key=lambda r: r.liquidity_usd or 0.0)
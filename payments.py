@@ -0,0 +1,331 @@
+# payments.py
+import os
+import re
+import time
+import asyncio
+import logging
+from decimal import Decimal
+from http_client import http
+from store import store
+from metrics import PAYMENT_ORDERS, PAYMENT_VERIFY_SECONDS, PAYMENT_RPC_SECONDS
+
+logger = logging.getLogger("payments")
+
+PAYMENT_BATCH_SIZE = int(os.getenv("PAYMENT_BATCH_SIZE", "20"))              # tx hashes per RPC batch request
+PAYMENT_POLL_INTERVAL = float(os.getenv("PAYMENT_POLL_INTERVAL", "5"))       # seconds between queue scans
+PAYMENT_RETRY_BASE = float(os.getenv("PAYMENT_RETRY_BASE", "5"))             # first re-check of an unconfirmed tx
+PAYMENT_RETRY_MAX = float(os.getenv("PAYMENT_RETRY_MAX", "60"))
+PAYMENT_VERIFY_TIMEOUT = float(os.getenv("PAYMENT_VERIFY_TIMEOUT", "1800"))  # unconfirmed this long -> admin
+PAYMENT_AMOUNT_TOLERANCE = float(os.getenv("PAYMENT_AMOUNT_TOLERANCE", "0.005"))  # underpayment still accepted
+PAYMENT_TIME_TOLERANCE = float(os.getenv("PAYMENT_TIME_TOLERANCE", "60"))    # seconds of block/clock skew before a tx counts as older than the order
+EVM_MIN_CONFIRMATIONS = int(os.getenv("EVM_MIN_CONFIRMATIONS", "3"))
+PAYMENT_ACTIVATION_CONCURRENCY = 10
+
+EVM_TX_HASH = re.compile(r"0x[0-9a-fA-F]{64}")
+SOLANA_SIGNATURE = re.compile(r"[1-9A-HJ-NP-Za-km-z]{86,88}")
+
+
+class Transfer:
+    """What a transaction paid: native amount to recipient (for Solana, the order's wallet if it received any).
+
+    mined_at is the unix time of its block, None if the chain didn't say.
+    """
+    __slots__ = ("recipient", "amount", "success", "confirmed", "mined_at")
+
+    def __init__(self, recipient, amount, success=True, confirmed=True, mined_at=None):
+        self.recipient = recipient
+        self.amount = amount
+        self.success = success
+        self.confirmed = confirmed
+        self.mined_at = mined_at
+
+
+class RpcClient:
+    """Looks up native transfers for many tx hashes at once. Subclasses speak one chain family's JSON-RPC."""
+
+    tx_pattern = EVM_TX_HASH
+
+    def __init__(self, url):
+        self.url = url
+        self.requests = 0
+
+    def parse_tx_hash(self, text):
+        """The tx hash in text (a bare hash or an explorer link), normalized; None if there isn't one."""
+        match = self.tx_pattern.search(text or "")
+        return match.group(0) if match else None
+
+    async def fetch(self, txs):
+        """{tx_hash: Transfer or None (unknown or not yet final)} for (tx_hash, wallet) pairs."""
+        results = {}
+        for i in range(0, len(txs), PAYMENT_BATCH_SIZE):
+            chunk = txs[i:i + PAYMENT_BATCH_SIZE]
+            start = time.perf_counter()
+            try:
+                results.update(await self._fetch_batch(chunk))
+            finally:
+                self.requests += 1
+                PAYMENT_RPC_SECONDS.observe(time.perf_counter() - start)
+        return results
+
+    async def _call(self, calls):
+        """One JSON-RPC batch request; returns {id: result}."""
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                   for i, (method, params) in enumerate(calls)]
+        replies = await http.post_json(self.url, payload)
+        if not isinstance(replies, list):
+            raise ConnectionError(f"RPC {self.url} returned no batch reply")
+        return {r.get("id"): r.get("result") for r in replies}
+
+
+class EvmRpcClient(RpcClient):
+    """Ethereum, Base and BSC: tx + receipt per hash, plus the head block for confirmations.
+
+    Confirmed transfers then get their block's timestamp in one more batch request.
+    """
+
+    def parse_tx_hash(self, text):
+        tx_hash = super().parse_tx_hash(text)
+        return tx_hash.lower() if tx_hash else None
+
+    async def _fetch_batch(self, txs):
+        calls = [("eth_blockNumber", [])]
+        for tx_hash, _ in txs:
+            calls.append(("eth_getTransactionByHash", [tx_hash]))
+            calls.append(("eth_getTransactionReceipt", [tx_hash]))
+        results = await self._call(calls)
+        head = int(results.get(0) or "0x0", 16)
+        transfers = {}
+        mined_in = {}  # tx_hash: block number of confirmed transfers
+        for i, (tx_hash, _) in enumerate(txs):
+            tx, receipt = results.get(1 + 2 * i), results.get(2 + 2 * i)
+            if not tx or not receipt or not receipt.get("blockNumber"):
+                transfers[tx_hash] = None
+                continue
+            confirmations = head - int(receipt["blockNumber"], 16) + 1
+            transfers[tx_hash] = Transfer(
+                recipient=(tx.get("to") or "").lower(),
+                amount=Decimal(int(tx.get("value") or "0x0", 16)) / Decimal(10 ** 18),
+                success=receipt.get("status") == "0x1",
+                confirmed=confirmations >= EVM_MIN_CONFIRMATIONS,
+            )
+            if transfers[tx_hash].confirmed:
+                mined_in[tx_hash] = receipt["blockNumber"]
+        blocks = sorted(set(mined_in.values()))
+        if blocks:
+            results = await self._call([("eth_getBlockByNumber", [block, False]) for block in blocks])
+            timestamps = {}
+            for i, block in enumerate(blocks):
+                if results.get(i):
+                    timestamps[block] = int(results[i]["timestamp"], 16)
+            for tx_hash, block in mined_in.items():
+                transfers[tx_hash].mined_at = timestamps.get(block)
+        return transfers
+
+
+class SolanaRpcClient(RpcClient):
+    """Solana: finalized getTransaction per signature; the amount is the wallet's lamport balance change."""
+
+    tx_pattern = SOLANA_SIGNATURE
+
+    async def _fetch_batch(self, txs):
+        options = {"encoding": "json", "commitment": "finalized", "maxSupportedTransactionVersion": 0}
+        results = await self._call([("getTransaction", [signature, options]) for signature, _ in txs])
+        transfers = {}
+        for i, (signature, wallet) in enumerate(txs):
+            tx = results.get(i)
+            if not tx:
+                transfers[signature] = None  # unknown or not finalized yet
+                continue
+            meta = tx.get("meta") or {}
+            loaded = meta.get("loadedAddresses") or {}
+            keys = tx["transaction"]["message"]["accountKeys"] + loaded.get("writable", []) + loaded.get("readonly", [])
+            deltas = [post - pre for pre, post in zip(meta.get("preBalances", []), meta.get("postBalances", []))]
+            index = keys.index(wallet) if wallet in keys else None
+            if index is None or index >= len(deltas) or deltas[index] <= 0:
+                # Not paid to us: report whoever received the most instead
+                index = max(range(len(deltas)), key=deltas.__getitem__, default=None)
+            received = deltas[index] if index is not None else 0
+            transfers[signature] = Transfer(
+                recipient=keys[index] if index is not None else "",
+                amount=Decimal(max(received, 0)) / Decimal(10 ** 9),
+                success=meta.get("err") is None,
+                mined_at=tx.get("blockTime"),
+            )
+        return transfers
+
+
+class StaticRpcClient(RpcClient):
+    """In-memory stand-in for tests and local runs: answers from a {tx_hash: Transfer} dict."""
+
+    def __init__(self, transfers=None, tx_pattern=EVM_TX_HASH):
+        super().__init__(url=None)
+        self.transfers = transfers if transfers is not None else {}
+        self.tx_pattern = tx_pattern
+
+    async def _fetch_batch(self, txs):
+        return {tx_hash: self.transfers.get(tx_hash) for tx_hash, _ in txs}
+
+
+# network: (env var with the RPC URL, default public endpoint, client class); set the env var to "none" to disable
+RPC_ENDPOINTS = {
+    "solana": ("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com", SolanaRpcClient),
+    "ethereum": ("ETHEREUM_RPC_URL", "https://ethereum-rpc.publicnode.com", EvmRpcClient),
+    "base": ("BASE_RPC_URL", "https://mainnet.base.org", EvmRpcClient),
+    "bsc": ("BSC_RPC_URL", "https://bsc-dataseed.bnbchain.org", EvmRpcClient),
+}
+
+
+def default_clients():
+    clients = {}
+    for network, (env, default, client_class) in RPC_ENDPOINTS.items():
+        url = os.getenv(env, default)
+        if url and url.lower() != "none":
+            clients[network] = client_class(url)
+    return clients
+
+
+def check_transfer(order, transfer):
+    """Reason the transfer doesn't settle order, or None when it does."""
+    if not transfer.success:
+        return "transaction failed on-chain"
+    shown_at = order.get("shown_at")
+    if shown_at:
+        # An older payment to our wallet, e.g. someone else's, submitted again
+        if transfer.mined_at is None:
+            return "block time unknown, can't tell whether it was paid after the payment details were shown"
+        if transfer.mined_at < shown_at - PAYMENT_TIME_TOLERANCE:
+            mined = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(transfer.mined_at))
+            return f"transaction mined at {mined}, before the payment details were shown"
+    wallet = order["wallet"]
+    recipient = transfer.recipient
+    if order["network"] != "solana":
+        wallet, recipient = wallet.lower(), recipient.lower()
+    if recipient != wallet:
+        return f"paid to {transfer.recipient or 'no recipient'}, not {order['wallet']}"
+    expected = Decimal(str(order["amount"]))
+    if transfer.amount < expected * (1 - Decimal(str(PAYMENT_AMOUNT_TOLERANCE))):
+        return f"received {transfer.amount.normalize():f} {order['unit']}, expected {expected.normalize():f}"
+    return None
+
+
+class PaymentVerifier:
+    """Checks submitted payments in batches and settles them without an admin.
+
+    Pending orders live in the store, so any replica can submit them and the one running the
+    verifier picks them up. A confirmed transfer of at least the quoted amount to the order's
+    wallet activates the order; anything else is escalated to an admin with the reason.
+    """
+
+    def __init__(self, activate, escalate, clients=None):
+        self.activate = activate  # async (order) -> True when the token went live
+        self.escalate = escalate  # async (order, reason)
+        self.clients = default_clients() if clients is None else clients
+        self._wakeup = None
+        self.is_running = False
+        self.verified = 0
+        self.escalated = 0
+
+    def parse_tx_hash(self, network, text):
+        client = self.clients.get(network)
+        if client is None:
+            return (text or "").strip() or None  # checked by an admin, keep what the user sent
+        return client.parse_tx_hash(text)
+
+    def wake(self):
+        """Check new submissions now instead of at the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        while self.is_running:
+            try:
+                orders = await asyncio.to_thread(store.due_orders, time.time(), PAYMENT_BATCH_SIZE * 4)
+                if orders:
+                    await self.verify(orders)
+                    if len(orders) == PAYMENT_BATCH_SIZE * 4:
+                        continue  # backlog: keep draining
+            except Exception as e:
+                logger.error(f"Payment verification round failed: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), PAYMENT_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def verify(self, orders):
+        """One round: batch lookups per chain in parallel, then settle, escalate or reschedule each order."""
+        by_network = {}
+        for order in orders:
+            by_network.setdefault(order["network"], []).append(order)
+
+        async def lookup(network, batch):
+            client = self.clients.get(network)
+            if client is None:
+                return network, batch, None, "no RPC client for this network"
+            try:
+                return network, batch, await client.fetch([(o["tx_hash"], o["wallet"]) for o in batch]), None
+            except Exception as e:
+                logger.warning(f"{network} RPC lookup of {len(batch)} payments failed: {e}")
+                return network, batch, {}, None
+
+        now = time.time()
+        later = []
+        decisions = []  # coroutines settling or escalating one order each
+        for network, batch, transfers, problem in await asyncio.gather(*(lookup(n, b) for n, b in by_network.items())):
+            for order in batch:
+                if problem:
+                    decisions.append(self._escalate(order, problem))
+                    continue
+                transfer = transfers.get(order["tx_hash"])
+                if transfer is None or not transfer.confirmed:
+                    if now - order["created_at"] > PAYMENT_VERIFY_TIMEOUT:
+                        state = "not found" if transfer is None else "not confirmed"
+                        decisions.append(self._escalate(order, f"transaction {state} after {PAYMENT_VERIFY_TIMEOUT / 60:.0f} min"))
+                    else:
+                        delay = min(PAYMENT_RETRY_MAX, PAYMENT_RETRY_BASE * 2 ** order["attempts"])
+                        later.append((now + delay, order["id"]))
+                    continue
+                problem_with_transfer = check_transfer(order, transfer)
+                if problem_with_transfer:
+                    decisions.append(self._escalate(order, problem_with_transfer))
+                else:
+                    decisions.append(self._settle(order))
+        await asyncio.to_thread(store.reschedule_orders, later)
+        # Activations wait on their channel post; run them side by side
+        semaphore = asyncio.Semaphore(PAYMENT_ACTIVATION_CONCURRENCY)
+
+        async def bounded(decision):
+            async with semaphore:
+                await decision
+        await asyncio.gather(*(bounded(d) for d in decisions))
+
+    async def _settle(self, order):
+        if not await asyncio.to_thread(store.set_order_status, order["id"], "activated", "verified on-chain"):
+            return  # an admin already handled it
+        try:
+            activated = await self.activate(order)
+        except Exception as e:
+            logger.error(f"Activating order {order['id']} failed: {e}")
+            activated = False
+        if not activated:
+            await asyncio.to_thread(store.set_order_status, order["id"], "pending", None, ("activated",))
+            await self._escalate(order, "payment verified, but activation failed")
+            return
+        self.verified += 1
+        PAYMENT_ORDERS.inc(outcome="verified")
+        PAYMENT_VERIFY_SECONDS.observe(time.time() - order["created_at"])
+
+    async def _escalate(self, order, reason):
+        if not await asyncio.to_thread(store.set_order_status, order["id"], "escalated", reason):
+            return
+        self.escalated += 1
+        PAYMENT_ORDERS.inc(outcome="escalated")
+        PAYMENT_VERIFY_SECONDS.observe(time.time() - order["created_at"])
+        logger.info(f"Order {order['id']} escalated: {reason}")
+        await self.escalate(order, reason)
+
+    def stats(self):
+        return {"verified": self.verified, "escalated": self.escalated,
+                "rpc_requests": {n: c.requests for n, c in self.clients.items()}}
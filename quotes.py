@@ -0,0 +1,108 @@
+# quotes.py
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger("quotes")
+
+QUOTE_REFRESH_INTERVAL = float(os.getenv("QUOTE_REFRESH_INTERVAL", "60"))  # seconds between background refreshes
+QUOTE_STALE_AFTER = float(os.getenv("QUOTE_STALE_AFTER", "900"))           # warn when a quote is older than this
+
+# Wrapped native tokens whose most liquid DexScreener pair prices each payment unit
+QUOTE_TOKENS = {
+    "SOL": ("solana", "So11111111111111111111111111111111111111112"),
+    "ETH": ("ethereum", "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"),
+    "BNB": ("bsc", "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"),
+}
+
+# Served until the first refresh succeeds
+FALLBACK_PRICES = {"SOL": 135.0, "ETH": 3150.0, "BNB": 900.0}
+
+
+def prices_from_pairs(decoded):
+    """{unit: usd price} from a multi-address lookup of QUOTE_TOKENS, using each token's most liquid pair."""
+    prices = {}
+    for unit, (chain, address) in QUOTE_TOKENS.items():
+        pair = (decoded or {}).get(address, {}).get(chain)
+        if pair is not None and pair.price_usd and pair.price_usd > 0:
+            prices[unit] = pair.price_usd
+    return prices
+
+
+class QuoteService:
+    """Native-token USD prices served from memory and refreshed in the background (stale-while-revalidate).
+
+    Readers never wait on the network: they get the last known price, and a read of a quote older
+    than the refresh interval kicks off a refresh for the next reader.
+    """
+
+    def __init__(self, interval=QUOTE_REFRESH_INTERVAL):
+        self.interval = interval
+        self.prices = dict(FALLBACK_PRICES)
+        self.updated_at = dict.fromkeys(FALLBACK_PRICES, 0.0)  # unit: unix time of the price (0 = fallback)
+        self._task = None
+        self._refreshing = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def quote(self, unit):
+        """(usd price, unix time it was quoted) for a payment unit; None for unknown units."""
+        price = self.prices.get(unit)
+        if price is None:
+            return None
+        updated_at = self.updated_at[unit]
+        if time.time() - updated_at > self.interval:
+            self._revalidate()
+        return price, updated_at
+
+    def _revalidate(self):
+        if self._refreshing is not None and not self._refreshing.done():
+            return
+        try:
+            self._refreshing = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            pass  # no loop, e.g. called from a script; the next async reader refreshes
+
+    async def refresh(self):
+        import main
+        try:
+            raw = await main.fetch_tokens_batch_raw([address for _, address in QUOTE_TOKENS.values()])
+        except Exception as e:
+            raw = None
+            logger.warning(f"Quote refresh failed: {e}")
+        prices = prices_from_pairs(raw)
+        now = time.time()
+        for unit, price in prices.items():
+            self.prices[unit] = price
+            self.updated_at[unit] = now
+        if len(prices) < len(QUOTE_TOKENS):
+            self.failures += 1
+            stale = [u for u in QUOTE_TOKENS if now - self.updated_at[u] > QUOTE_STALE_AFTER]
+            if stale:
+                logger.warning(f"Serving stale quotes for {', '.join(stale)}")
+        else:
+            self.refreshes += 1
+        return prices
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._refreshing):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = self._refreshing = None
+
+    def max_age(self):
+        return time.time() - min(self.updated_at.values())
+
+
+quotes = QuoteService()
@@ -0,0 +1,72 @@
+# scheduler.py
+import os
+import heapq
+import itertools
+
+MIN_POLL_INTERVAL = float(os.getenv("MIN_POLL_INTERVAL", "5"))     # hottest tokens, seconds
+BASE_POLL_INTERVAL = float(os.getenv("BASE_POLL_INTERVAL", "10"))  # new tokens / no data
+MAX_POLL_INTERVAL = float(os.getenv("MAX_POLL_INTERVAL", "60"))    # calmest tokens
+
+
+def _num(value):
+    try: return abs(float(value))
+    except (TypeError, ValueError): return 0.0
+
+
+def adaptive_interval(pair):
+    """Poll interval for a token from its recent volatility and volume pace.
+
+    A calm token (flat price, steady volume) drifts towards MAX_POLL_INTERVAL;
+    fast moves or a 5m volume burst pull it down to MIN_POLL_INTERVAL.
+    """
+    if not pair:
+        return BASE_POLL_INTERVAL
+    h1_volume = _num(pair.volume_h1)
+    # 1.0 means the last 5m traded at the hour's average pace
+    pace = _num(pair.volume_m5) * 12 / h1_volume if h1_volume else 0.0
+    score = _num(pair.change_m5) + _num(pair.change_h1) / 5 + pace
+    return min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, MAX_POLL_INTERVAL / (1 + score)))
+
+
+class PollScheduler:
+    """Min-heap of per-token next-poll times with lazy removal."""
+
+    def __init__(self):
+        self._heap = []                 # (due_at, seq, address)
+        self._due = {}                  # address: seq of its live heap entry
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._due)
+
+    def __contains__(self, address):
+        return address in self._due
+
+    def schedule(self, address, due_at):
+        seq = next(self._seq)
+        self._due[address] = seq
+        heapq.heappush(self._heap, (due_at, seq, address))
+
+    def remove(self, address):
+        self._due.pop(address, None)
+
+    def next_due(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now, limit):
+        """Remove and return up to limit addresses due at or before now, earliest first."""
+        due = []
+        while len(due) < limit:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, address = heapq.heappop(self._heap)
+            del self._due[address]
+            due.append(address)
+        return due
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._due.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
@@ -0,0 +1,225 @@
+# send_queue.py
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import deque
+from aiogram.utils.exceptions import RetryAfter, NetworkError
+from metrics import TELEGRAM_SEND_SECONDS, TELEGRAM_SEND_ERRORS, SEND_QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger("send_queue")
+
+# Telegram: ~30 msg/s per bot, ~1 msg/s per private chat, 20 msg/min per group or channel
+GLOBAL_SEND_RATE = float(os.getenv("GLOBAL_SEND_RATE", "25"))
+PRIVATE_CHAT_RATE = float(os.getenv("PRIVATE_CHAT_RATE", "1"))
+GROUP_CHAT_RATE = float(os.getenv("GROUP_CHAT_RATE", str(20 / 60)))
+SEND_QUEUE_MAX_SIZE = int(os.getenv("SEND_QUEUE_MAX_SIZE", "1000"))  # producers block beyond this
+SEND_WORKERS = int(os.getenv("SEND_WORKERS", "8"))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+LATENCY_SAMPLES = 1000
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """Consume a token if available; otherwise return seconds until one is."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self.take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class SendJob:
+    __slots__ = ("chat_id", "send", "future", "enqueued_at", "attempts")
+
+    def __init__(self, chat_id, send, future):
+        self.chat_id = chat_id
+        self.send = send  # zero-arg coroutine function, called again on retry
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueue:
+    """Outbound Telegram sends, drained by workers under global and per-chat rate limits.
+
+    Jobs for one chat are delivered in order. Chats waiting on their own limit don't block
+    other chats. RetryAfter pauses only the affected chat. A full queue makes submit() wait.
+    """
+
+    def __init__(self, max_size=SEND_QUEUE_MAX_SIZE, workers=SEND_WORKERS):
+        self.max_size = max_size
+        self.worker_count = workers
+        self._global = TokenBucket(GLOBAL_SEND_RATE, capacity=GLOBAL_SEND_RATE)
+        self._buckets = {}           # chat_id: TokenBucket
+        self._pending = {}           # chat_id: deque of SendJob
+        self._ready = []             # (available_at, seq, chat_id) for idle chats with pending jobs
+        self._seq = itertools.count()
+        self._slots = None
+        self._wakeup = None
+        self._workers = []
+        self.depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # enqueue -> delivered, seconds
+
+    def start(self):
+        if self._workers:
+            return
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        logger.info(f"Send queue started with {self.worker_count} workers")
+
+    async def stop(self, timeout=10):
+        """Give queued sends up to timeout seconds to drain, then cancel the workers."""
+        deadline = time.monotonic() + timeout
+        while self.depth and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            rate = GROUP_CHAT_RATE if int(chat_id) < 0 else PRIVATE_CHAT_RATE
+            bucket = self._buckets[chat_id] = TokenBucket(rate)
+        return bucket
+
+    def _make_ready(self, chat_id, available_at):
+        heapq.heappush(self._ready, (available_at, next(self._seq), chat_id))
+        self._wakeup.set()
+
+    async def submit(self, chat_id, send):
+        """Queue send() for chat_id, waiting while the queue is full. Returns a future of its result."""
+        self.start()
+        await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self.depth += 1
+        jobs = self._pending.get(chat_id)
+        if jobs is None:
+            self._pending[chat_id] = deque([SendJob(chat_id, send, future)])
+            self._make_ready(chat_id, time.monotonic())
+        else:
+            jobs.append(SendJob(chat_id, send, future))
+        return future
+
+    async def send(self, chat_id, send):
+        """Queue send() and wait for it to be delivered."""
+        return await (await self.submit(chat_id, send))
+
+    async def _next_job(self):
+        while True:
+            now = time.monotonic()
+            if self._ready and self._ready[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._ready)
+                wait = self._bucket(chat_id).take(now)
+                if wait:
+                    self._make_ready(chat_id, now + wait)
+                    continue
+                return self._pending[chat_id][0]
+            self._wakeup.clear()
+            timeout = self._ready[0][0] - now if self._ready else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finish(self, job, result=None, error=None):
+        jobs = self._pending[job.chat_id]
+        jobs.popleft()
+        if jobs:
+            self._make_ready(job.chat_id, time.monotonic())
+        else:
+            del self._pending[job.chat_id]
+        self.depth -= 1
+        self._slots.release()
+        if job.future.done():
+            return
+        if error is None:
+            self.sent += 1
+            self.latencies.append(time.monotonic() - job.enqueued_at)
+            SEND_QUEUE_WAIT_SECONDS.observe(self.latencies[-1])
+            job.future.set_result(result)
+        else:
+            self.failed += 1
+            job.future.set_exception(error)
+            job.future.exception()  # fire-and-forget callers never read it
+
+    async def _worker(self):
+        while True:
+            job = await self._next_job()
+            await self._global.acquire()
+            job.attempts += 1
+            start = time.perf_counter()
+            try:
+                result = await job.send()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - start)
+                TELEGRAM_SEND_ERRORS.inc(error=type(e).__name__)
+                self._failed_attempt(job, e)
+            else:
+                TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - start)
+                self._finish(job, result)
+            if len(self._buckets) > 10000:
+                self._prune_buckets()
+
+    def _failed_attempt(self, job, error):
+        if isinstance(error, RetryAfter):
+            delay = error.timeout
+            logger.warning(f"Flood control for {job.chat_id}, retrying in {delay}s")
+        elif isinstance(error, (NetworkError, asyncio.TimeoutError, OSError)):
+            delay = 2 ** job.attempts
+        else:
+            logger.error(f"Send to {job.chat_id} failed: {error}")
+            self._finish(job, error=error)
+            return
+        if job.attempts > SEND_MAX_RETRIES:
+            logger.error(f"Giving up on send to {job.chat_id} after {job.attempts} attempts: {error}")
+            self._finish(job, error=error)
+            return
+        self.retried += 1
+        self._make_ready(job.chat_id, time.monotonic() + delay)
+
+    def _prune_buckets(self):
+        now = time.monotonic()
+        for chat_id, bucket in list(self._buckets.items()):
+            if chat_id not in self._pending and now - bucket.updated > 60:
+                del self._buckets[chat_id]
+
+    def stats(self):
+        samples = sorted(self.latencies)
+        def pct(p): return round(samples[min(len(samples) - 1, int(len(samples) * p))], 4) if samples else None
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "latency_p50": pct(0.5),
+            "latency_p99": pct(0.99),
+        }
+
+
+send_queue = SendQueue()
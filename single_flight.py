@@ -0,0 +1,33 @@
+# single_flight.py
+import asyncio
+
+
+class SingleFlight:
+    """At most one running task per key, shared by every caller that asks for the key meanwhile.
+
+    The work runs as its own task: a cancelled caller stops waiting for it, but doesn't cancel
+    it for the others. The key is free again once the task is done.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # key: Task
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def run(self, key, work):
+        """Result of work() (a coroutine function), started only if no task for key is running."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.create_task(work())
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller went away
@@ -0,0 +1,408 @@
+# store.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("store")
+
+# omnitrending.db in the repo predates this schema and is not a readable SQLite file
+DB_PATH = os.getenv("DB_PATH", "hotpairs.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activations (
+    address      TEXT PRIMARY KEY,
+    network      TEXT,
+    duration     TEXT,
+    activated_at REAL NOT NULL,
+    expires_at   REAL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    address       TEXT PRIMARY KEY,
+    price_usd     REAL,
+    liquidity_usd REAL,
+    volume_h24    REAL,
+    change_h1     REAL,
+    updated_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS live_cards (
+    address    TEXT PRIMARY KEY,
+    chat_id    INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    is_photo   INTEGER NOT NULL,
+    text_hash  INTEGER
+);
+CREATE TABLE IF NOT EXISTS fsm_states (
+    chat_id    TEXT NOT NULL,
+    user_id    TEXT NOT NULL,
+    state      TEXT,
+    data       TEXT NOT NULL,
+    bucket     TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS fsm_states_updated_at ON fsm_states (updated_at);
+CREATE TABLE IF NOT EXISTS orders (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id       INTEGER NOT NULL,
+    user_name     TEXT,
+    address       TEXT NOT NULL,
+    network       TEXT NOT NULL,
+    duration      TEXT,
+    usd           REAL,
+    amount        REAL NOT NULL,
+    unit          TEXT,
+    wallet        TEXT NOT NULL,
+    tx_hash       TEXT NOT NULL,
+    shown_at      REAL,
+    status        TEXT NOT NULL,
+    reason        TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    next_check_at REAL NOT NULL,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    UNIQUE (network, tx_hash)
+);
+CREATE INDEX IF NOT EXISTS orders_due ON orders (status, next_check_at);
+CREATE TABLE IF NOT EXISTS subscriptions (
+    chat_id    INTEGER NOT NULL,
+    address    TEXT NOT NULL,
+    kinds      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, address)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_address ON subscriptions (address);
+"""
+
+ORDER_FIELDS = ("user_id", "user_name", "address", "network", "duration", "usd", "amount", "unit", "wallet", "tx_hash",
+                "shown_at")
+
+# Columns added after a table was first released: (table, column, type)
+MIGRATIONS = (("orders", "shown_at", "REAL"),)
+
+
+class TokenStore:
+    """SQLite (WAL) persistence for activated tokens and their last snapshot.
+
+    Methods are blocking; the monitor calls them through asyncio.to_thread.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            for table, column, kind in MIGRATIONS:
+                if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    try:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+                    except sqlite3.OperationalError:
+                        pass  # another process sharing the file added it first
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Token store opened at {self.path}")
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def save_activation(self, address, network, duration, activated_at, expires_at):
+        """Activate address for a package ending at expires_at (None = no limit); returns the expiry saved.
+
+        Renewing a package that hasn't ended adds the new package to the time left instead of
+        restarting from activated_at. An activation without a limit keeps it.
+        """
+        with self._lock:
+            conn = self.connect()
+            row = conn.execute(
+                "INSERT INTO activations (address, network, duration, activated_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(address) DO UPDATE SET network=excluded.network, duration=excluded.duration, "
+                "activated_at=excluded.activated_at, expires_at=CASE "
+                "WHEN excluded.expires_at IS NULL OR activations.expires_at IS NULL THEN NULL "
+                "WHEN activations.expires_at > excluded.activated_at "
+                "THEN activations.expires_at + (excluded.expires_at - excluded.activated_at) "
+                "ELSE excluded.expires_at END "
+                "RETURNING expires_at",
+                (address, network, duration, activated_at, expires_at),
+            ).fetchone()
+            conn.commit()
+            return row[0]
+
+    def remove_tokens(self, addresses, now=None):
+        """Delete the activations of addresses that ended by now, with their snapshots, live cards and subscriptions.
+
+        An activation renewed in the meantime (by this or another process) is kept; returns
+        {address: expires_at} for those.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("DELETE FROM activations WHERE address = ? AND expires_at <= ?", [(a, now) for a in addresses])
+                renewed = {}
+                for address in addresses:
+                    row = conn.execute("SELECT expires_at FROM activations WHERE address = ?", (address,)).fetchone()
+                    if row is not None:
+                        renewed[address] = row[0]
+                rows = [(a,) for a in addresses if a not in renewed]
+                conn.executemany("DELETE FROM snapshots WHERE address = ?", rows)
+                conn.executemany("DELETE FROM live_cards WHERE address = ?", rows)
+                conn.executemany("DELETE FROM subscriptions WHERE address = ?", rows)
+                return renewed
+            finally:
+                conn.commit()
+
+    def save_snapshots(self, rows):
+        """Upsert (address, price_usd, liquidity_usd, volume_h24, change_h1, updated_at) rows in one transaction."""
+        if not rows:
+            return
+        with self._lock:
+            conn = self.connect()
+            conn.executemany(
+                "INSERT INTO snapshots (address, price_usd, liquidity_usd, volume_h24, change_h1, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(address) DO UPDATE SET price_usd=excluded.price_usd, "
+                "liquidity_usd=excluded.liquidity_usd, volume_h24=excluded.volume_h24, "
+                "change_h1=excluded.change_h1, updated_at=excluded.updated_at",
+                rows,
+            )
+            conn.commit()
+
+    def save_live_cards(self, rows):
+        """Upsert (address, chat_id, message_id, is_photo, text_hash) rows in one transaction."""
+        if not rows:
+            return
+        with self._lock:
+            conn = self.connect()
+            conn.executemany(
+                "INSERT INTO live_cards (address, chat_id, message_id, is_photo, text_hash) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(address) DO UPDATE SET chat_id=excluded.chat_id, message_id=excluded.message_id, "
+                "is_photo=excluded.is_photo, text_hash=excluded.text_hash",
+                rows,
+            )
+            conn.commit()
+
+    def delete_live_card(self, address):
+        with self._lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM live_cards WHERE address = ?", (address,))
+            conn.commit()
+
+    def load_live_cards(self):
+        with self._lock:
+            conn = self.connect()
+            return conn.execute("SELECT address, chat_id, message_id, is_photo, text_hash FROM live_cards").fetchall()
+
+    def load_fsm_state(self, chat_id, user_id):
+        """(state, data, bucket, updated_at) for one chat/user, or None."""
+        with self._lock:
+            conn = self.connect()
+            return conn.execute(
+                "SELECT state, data, bucket, updated_at FROM fsm_states WHERE chat_id = ? AND user_id = ?",
+                (chat_id, user_id),
+            ).fetchone()
+
+    def save_fsm_states(self, rows):
+        """Upsert (chat_id, user_id, state, data, bucket, updated_at) rows in one transaction.
+
+        A row older than the stored one is ignored, so the last write wins across processes.
+        """
+        if not rows:
+            return
+        with self._lock:
+            conn = self.connect()
+            conn.executemany(
+                "INSERT INTO fsm_states (chat_id, user_id, state, data, bucket, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(chat_id, user_id) DO UPDATE SET state=excluded.state, data=excluded.data, "
+                "bucket=excluded.bucket, updated_at=excluded.updated_at "
+                "WHERE excluded.updated_at >= fsm_states.updated_at",
+                rows,
+            )
+            conn.commit()
+
+    def expire_fsm_states(self, before):
+        """Delete states last written before the given timestamp. Returns the number removed."""
+        with self._lock:
+            conn = self.connect()
+            removed = conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (before,)).rowcount
+            conn.commit()
+            return removed
+
+    def _rows(self, sql, params=()):
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(r) for r in conn.execute(sql, params)]
+        finally:
+            conn.row_factory = None
+
+    def create_order(self, order, now=None):
+        """Insert a pending order (ORDER_FIELDS). Returns its id, or None if the tx hash was already submitted."""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self.connect()
+            try:
+                cursor = conn.execute(
+                    f"INSERT INTO orders ({', '.join(ORDER_FIELDS)}, status, next_check_at, created_at, updated_at) "
+                    f"VALUES ({', '.join('?' * len(ORDER_FIELDS))}, 'pending', ?, ?, ?)",
+                    (*(order.get(f) for f in ORDER_FIELDS), now, now, now),
+                )
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                return None
+            conn.commit()
+            return cursor.lastrowid
+
+    def load_order(self, order_id):
+        with self._lock:
+            rows = self._rows("SELECT * FROM orders WHERE id = ?", (order_id,))
+        return rows[0] if rows else None
+
+    def due_orders(self, now, limit):
+        """Pending orders whose next verification attempt is due, oldest first."""
+        with self._lock:
+            return self._rows(
+                "SELECT * FROM orders WHERE status = 'pending' AND next_check_at <= ? ORDER BY next_check_at LIMIT ?",
+                (now, limit),
+            )
+
+    def set_order_status(self, order_id, status, reason=None, expected=("pending",)):
+        """Move an order to status if it is still in one of expected. False when someone else got there first."""
+        with self._lock:
+            conn = self.connect()
+            updated = conn.execute(
+                f"UPDATE orders SET status = ?, reason = ?, updated_at = ? "
+                f"WHERE id = ? AND status IN ({', '.join('?' * len(expected))})",
+                (status, reason, time.time(), order_id, *expected),
+            ).rowcount
+            conn.commit()
+            return updated == 1
+
+    def reschedule_orders(self, rows):
+        """(next_check_at, id) rows: pending orders to check again later, in one transaction."""
+        if not rows:
+            return
+        with self._lock:
+            conn = self.connect()
+            conn.executemany(
+                "UPDATE orders SET next_check_at = ?, attempts = attempts + 1 WHERE id = ? AND status = 'pending'", rows
+            )
+            conn.commit()
+
+    def acquire_lease(self, name, owner, ttl, now=None):
+        """Take or renew lease name for owner. True while owner holds it; other processes see it until it expires."""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                if row is not None and row[0] != owner and row[1] > now:
+                    return False
+                conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                             (name, owner, now + ttl))
+                return True
+            finally:
+                conn.commit()
+
+    def release_lease(self, name, owner):
+        with self._lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+            conn.commit()
+
+    def active_address(self, address, now=None):
+        """The stored spelling of an unexpired activation matching address (EVM case-insensitively), or None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self.connect()
+            row = conn.execute(
+                "SELECT address FROM activations WHERE (address = ? OR (? LIKE '0x%' AND lower(address) = lower(?))) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (address, address, address, now),
+            ).fetchone()
+            return row[0] if row else None
+
+    def save_subscription(self, chat_id, address, kinds, max_per_chat, now=None):
+        """Subscribe chat_id to address for kinds (comma-separated). False if the chat already has max_per_chat other tokens."""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                count, exists = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(address = ?), 0) FROM subscriptions WHERE chat_id = ?", (address, chat_id)
+                ).fetchone()
+                if not exists and count >= max_per_chat:
+                    return False
+                conn.execute(
+                    "INSERT INTO subscriptions (chat_id, address, kinds, created_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(chat_id, address) DO UPDATE SET kinds=excluded.kinds",
+                    (chat_id, address, kinds, now),
+                )
+                return True
+            finally:
+                conn.commit()
+
+    def delete_subscription(self, chat_id, address):
+        with self._lock:
+            conn = self.connect()
+            removed = conn.execute("DELETE FROM subscriptions WHERE chat_id = ? AND address = ?", (chat_id, address)).rowcount
+            conn.commit()
+            return removed == 1
+
+    def delete_chat_subscriptions(self, chat_ids):
+        """Drop every subscription of chat_ids (chats that blocked the bot or no longer exist)."""
+        with self._lock:
+            conn = self.connect()
+            conn.executemany("DELETE FROM subscriptions WHERE chat_id = ?", [(c,) for c in chat_ids])
+            conn.commit()
+
+    def chat_subscriptions(self, chat_id):
+        """(address, kinds) rows of one chat, oldest first."""
+        with self._lock:
+            conn = self.connect()
+            return conn.execute(
+                "SELECT address, kinds FROM subscriptions WHERE chat_id = ? ORDER BY created_at", (chat_id,)
+            ).fetchall()
+
+    def load_subscriptions(self, now=None):
+        """Every (chat_id, address, kinds) row whose token is still activated."""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self.connect()
+            return conn.execute(
+                "SELECT s.chat_id, s.address, s.kinds FROM subscriptions s JOIN activations a ON a.address = s.address "
+                "WHERE a.expires_at IS NULL OR a.expires_at > ?",
+                (now,),
+            ).fetchall()
+
+    def load_active(self, now=None):
+        """All unexpired activations joined with their last snapshot (None columns if never polled)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._rows(
+                "SELECT a.address, a.network, a.duration, a.activated_at, a.expires_at, "
+                "s.price_usd, s.liquidity_usd, s.volume_h24, s.change_h1, s.updated_at "
+                "FROM activations a LEFT JOIN snapshots s ON s.address = a.address "
+                "WHERE a.expires_at IS NULL OR a.expires_at > ?",
+                (now,),
+            )
+
+
+store = TokenStore()
@@ -0,0 +1,27 @@
+# tests/test_payments.py
+from decimal import Decimal
+
+from payments import Transfer, check_transfer, PAYMENT_TIME_TOLERANCE
+
+SHOWN_AT = 1_700_000_000.0
+ORDER = {"network": "solana", "wallet": "Wallet111", "amount": 1.5, "unit": "SOL", "shown_at": SHOWN_AT}
+
+
+def transfer(mined_at):
+    return Transfer("Wallet111", Decimal("1.5"), mined_at=mined_at)
+
+
+def test_paid_after_details_were_shown_settles():
+    assert check_transfer(ORDER, transfer(SHOWN_AT + 30)) is None
+
+
+def test_paid_before_details_were_shown_is_escalated():
+    assert "before the payment details were shown" in check_transfer(ORDER, transfer(SHOWN_AT - PAYMENT_TIME_TOLERANCE - 1))
+
+
+def test_unknown_block_time_is_not_accepted():
+    assert "block time unknown" in check_transfer(ORDER, transfer(None))
+
+
+def test_orders_without_shown_at_skip_the_time_check():
+    assert check_transfer({**ORDER, "shown_at": None}, transfer(None)) is None
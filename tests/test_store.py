@@ -0,0 +1,30 @@
+# tests/test_store.py
+import pytest
+
+from store import TokenStore
+
+HOUR = 3600
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = TokenStore(str(tmp_path / "test.db"))
+    yield s
+    s.close()
+
+
+def test_renewal_adds_to_the_time_left(store):
+    store.save_activation("A", "solana", "6h", NOW - 3 * HOUR, NOW + 3 * HOUR)
+    assert store.save_activation("A", "solana", "6h", NOW, NOW + 6 * HOUR) == NOW + 9 * HOUR
+    assert store.load_active(NOW)[0]["expires_at"] == NOW + 9 * HOUR
+
+
+def test_renewal_after_expiry_starts_from_now(store):
+    store.save_activation("A", "solana", "6h", NOW - 7 * HOUR, NOW - HOUR)
+    assert store.save_activation("A", "solana", "6h", NOW, NOW + 6 * HOUR) == NOW + 6 * HOUR
+
+
+def test_unlimited_activation_stays_unlimited(store):
+    store.save_activation("A", "solana", None, NOW - HOUR, None)
+    assert store.save_activation("A", "solana", "6h", NOW, NOW + 6 * HOUR) is None
@@ -0,0 +1,99 @@
+# timeseries.py
+import os
+import sys
+from array import array
+
+HISTORY_SIZE = int(os.getenv("HISTORY_SIZE", "32"))  # samples kept per token
+
+FIELDS = ("ts", "price", "liquidity", "volume", "change_h1")
+_STRIDE = len(FIELDS)
+_INDEX = {name: i for i, name in enumerate(FIELDS)}
+
+
+class Sample:
+    __slots__ = FIELDS
+
+    def __init__(self, ts, price, liquidity, volume, change_h1):
+        self.ts = ts
+        self.price = price
+        self.liquidity = liquidity
+        self.volume = volume
+        self.change_h1 = change_h1
+
+    def __repr__(self):
+        return f"Sample(ts={self.ts}, price={self.price}, liquidity={self.liquidity}, volume={self.volume}, change_h1={self.change_h1})"
+
+
+def sample_from_pair(pair, ts):
+    return Sample(ts, pair.price_usd or 0.0, pair.liquidity_usd or 0.0, pair.volume_h24 or 0.0, pair.change_h1 or 0.0)
+
+
+class RingBuffer:
+    """Fixed-size per-token history packed into one array('d') (FIELDS interleaved)."""
+
+    __slots__ = ("capacity", "_data", "_start", "_len")
+
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.capacity = capacity
+        self._data = array('d', bytes(8 * _STRIDE * capacity))
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, sample):
+        if self._len < self.capacity:
+            slot = (self._start + self._len) % self.capacity
+            self._len += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        base = slot * _STRIDE
+        self._data[base:base + _STRIDE] = array('d', (sample.ts, sample.price, sample.liquidity, sample.volume, sample.change_h1))
+
+    def _base(self, i):
+        # i counts from the oldest sample; negative from the newest
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return ((self._start + i) % self.capacity) * _STRIDE
+
+    def __getitem__(self, i):
+        base = self._base(i)
+        return Sample(*self._data[base:base + _STRIDE])
+
+    def latest(self):
+        return self[-1] if self._len else None
+
+    def values(self, field, n=None):
+        """Oldest-to-newest values of one field over the last n samples."""
+        offset = _INDEX[field]
+        n = self._len if n is None else min(n, self._len)
+        return [self._data[self._base(i) + offset] for i in range(self._len - n, self._len)]
+
+    def moving_average(self, field, n, end=None, since=None):
+        """Mean of field over the n samples before index end (default: through the newest).
+
+        With since, samples taken before that unix time are left out.
+        """
+        end = self._len if end is None else end
+        start = max(0, end - n)
+        if since is not None:
+            while start < end and self._data[self._base(start)] < since:
+                start += 1
+        if end <= start:
+            return None
+        offset = _INDEX[field]
+        return sum(self._data[self._base(i) + offset] for i in range(start, end)) / (end - start)
+
+    def delta(self, field):
+        """Change in field between the two newest samples (None with fewer than two)."""
+        if self._len < 2:
+            return None
+        offset = _INDEX[field]
+        return self._data[self._base(-1) + offset] - self._data[self._base(-2) + offset]
+
+    def nbytes(self):
+        return sys.getsizeof(self) + sys.getsizeof(self._data)
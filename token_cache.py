@@ -0,0 +1,81 @@
+# token_cache.py
+import os
+import time
+import logging
+from collections import OrderedDict
+from single_flight import SingleFlight
+
+logger = logging.getLogger("token_cache")
+
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "20"))          # seconds a lookup stays fresh
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "2048"))  # entries before LRU eviction
+
+
+def cache_key(address):
+    # EVM addresses are case-insensitive; Solana base58 addresses are not
+    address = address.strip()
+    return address.lower() if address.startswith("0x") else address
+
+
+class TokenCache:
+    """Bounded TTL/LRU cache of raw DexScreener lookups with single-flight fetches."""
+
+    def __init__(self, ttl=TOKEN_CACHE_TTL, max_size=TOKEN_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key: (expires_at, data)
+        self._inflight = SingleFlight()  # fetches shared by concurrent callers
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, address):
+        key = cache_key(address)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def put(self, address, data):
+        if data is None:
+            return
+        key = cache_key(address)
+        self._entries[key] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, address, fetch):
+        """Return cached data for address, else await fetch(address) once for all concurrent callers."""
+        data = self.get(address)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        key = cache_key(address)
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await self._inflight.run(key, lambda: self._fetch(address, fetch))
+
+    async def _fetch(self, address, fetch):
+        data = await fetch(address)
+        self.put(address, data)
+        return data
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,147 @@
+# watchlists.py
+import os
+import asyncio
+import logging
+from aiogram.utils.exceptions import Unauthorized, ChatNotFound
+from store import store
+from token_cache import cache_key
+from aggregator import ALERT_KINDS
+
+logger = logging.getLogger("watchlists")
+
+WATCHLIST_MAX_TOKENS = int(os.getenv("WATCHLIST_MAX_TOKENS", "20"))           # tokens one chat can watch
+WATCHLIST_SYNC_INTERVAL = float(os.getenv("WATCHLIST_SYNC_INTERVAL", "10"))   # seconds between reloads from the store
+FANOUT_MAX_IN_FLIGHT = int(os.getenv("FANOUT_MAX_IN_FLIGHT", "500"))          # queued watchlist sends; the rest of the send queue stays free for replies
+
+ALL_KINDS = (1 << len(ALERT_KINDS)) - 1
+
+
+def kinds_mask(kinds):
+    return sum(1 << ALERT_KINDS.index(k) for k in set(kinds) if k in ALERT_KINDS)
+
+
+def mask_kinds(mask):
+    return [k for i, k in enumerate(ALERT_KINDS) if mask >> i & 1]
+
+
+class Watchlists:
+    """Chats subscribed to activated tokens, and the fan-out that delivers each rendered alert to them.
+
+    The store holds the subscriptions; the token -> subscribers index is rebuilt from it every
+    WATCHLIST_SYNC_INTERVAL, so /watch on any replica reaches the process that posts alerts.
+    Deliveries go through the send queue and so share its global and per-chat rate limits.
+    """
+
+    def __init__(self, max_in_flight=FANOUT_MAX_IN_FLIGHT):
+        self._by_token = {}   # cache_key(address): {chat_id: kinds mask}
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._fanouts = set()
+        self._task = None
+        self.fanouts = 0
+        self.delivered = 0
+        self.failed = 0
+        self.dropped_chats = 0
+
+    async def load(self):
+        by_token = {}
+        for chat_id, address, kinds in await asyncio.to_thread(store.load_subscriptions):
+            by_token.setdefault(cache_key(address), {})[chat_id] = kinds_mask(kinds.split(","))
+        self._by_token = by_token
+
+    async def subscribe(self, chat_id, address, kinds=ALERT_KINDS):
+        """Watch an activated token. False when the chat already watches WATCHLIST_MAX_TOKENS others."""
+        kinds = mask_kinds(kinds_mask(kinds)) or list(ALERT_KINDS)
+        if not await asyncio.to_thread(store.save_subscription, chat_id, address, ",".join(kinds), WATCHLIST_MAX_TOKENS):
+            return False
+        self._by_token.setdefault(cache_key(address), {})[chat_id] = kinds_mask(kinds)
+        return True
+
+    async def unsubscribe(self, chat_id, address):
+        subscribers = self._by_token.get(cache_key(address))
+        if subscribers:
+            subscribers.pop(chat_id, None)
+        return await asyncio.to_thread(store.delete_subscription, chat_id, address)
+
+    def forget(self, addresses):
+        """Drop the subscribers of tokens whose package ended; the store deletes their rows with the activation."""
+        for address in addresses:
+            self._by_token.pop(cache_key(address), None)
+
+    def subscribers(self, address, kinds):
+        """Chats watching address for any of kinds."""
+        mask = kinds_mask(kinds) or ALL_KINDS
+        return [chat_id for chat_id, wanted in self._by_token.get(cache_key(address), {}).items() if wanted & mask]
+
+    def fan_out(self, address, kinds, text, logo_url=None, reply_markup=None):
+        """Deliver an alert rendered once to every chat watching address for kinds, in the background.
+
+        Returns the number of chats it goes to.
+        """
+        chats = self.subscribers(address, kinds)
+        if chats:
+            self.fanouts += 1
+            task = asyncio.create_task(self._deliver(chats, text, logo_url, reply_markup))
+            self._fanouts.add(task)
+            task.add_done_callback(self._fanouts.discard)
+        return len(chats)
+
+    async def _deliver(self, chats, text, logo_url, reply_markup):
+        import main
+
+        def send(chat_id):
+            return lambda: main.send_token_card(chat_id, text, logo_url, reply_markup=reply_markup)
+
+        # send_token_card uploads the logo once; chats sent to meanwhile get Telegram's file_id
+        for chat_id in chats:
+            await self._in_flight.acquire()
+            future = await main.send_queue.submit(chat_id, send(chat_id))
+            future.add_done_callback(lambda f, c=chat_id: self._sent(c, f))
+
+    def _sent(self, chat_id, future):
+        self._in_flight.release()
+        error = None if future.cancelled() else future.exception()
+        if error is None:
+            self.delivered += 1
+            return
+        self.failed += 1
+        if isinstance(error, (Unauthorized, ChatNotFound)):
+            # Blocked the bot, left or deleted: stop sending there
+            self.dropped_chats += 1
+            for subscribers in self._by_token.values():
+                subscribers.pop(chat_id, None)
+            task = asyncio.create_task(asyncio.to_thread(store.delete_chat_subscriptions, [chat_id]))
+            self._fanouts.add(task)
+            task.add_done_callback(self._fanouts.discard)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Failed to reload watchlists: {e}")
+            await asyncio.sleep(WATCHLIST_SYNC_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop syncing and fanning out; sends already queued are left to the send queue to drain."""
+        tasks = [t for t in (self._task, *self._fanouts) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def stats(self):
+        return {
+            "tokens": len(self._by_token),
+            "subscriptions": sum(len(s) for s in self._by_token.values()),
+            "fanouts": self.fanouts,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "dropped_chats": self.dropped_chats,
+        }
+
+
+watchlists = Watchlists()
@@ -0,0 +1,26 @@
+# webhook.py
+import os
+import asyncio
+from aiohttp import web
+from aiogram.dispatcher.webhook import WebhookRequestHandler
+
+WEBHOOK_MAX_CONCURRENT_UPDATES = int(os.getenv("WEBHOOK_MAX_CONCURRENT_UPDATES", "64"))  # per process
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # sent back by Telegram in X-Telegram-Bot-Api-Secret-Token
+
+
+class BoundedWebhookRequestHandler(WebhookRequestHandler):
+    """Processes webhook updates concurrently, at most WEBHOOK_MAX_CONCURRENT_UPDATES at a time."""
+
+    _semaphore = None
+
+    @classmethod
+    def semaphore(cls):
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(WEBHOOK_MAX_CONCURRENT_UPDATES)
+        return cls._semaphore
+
+    async def post(self):
+        if WEBHOOK_SECRET and self.request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            raise web.HTTPUnauthorized()
+        async with self.semaphore():
+            return await super().post()
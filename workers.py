@@ -0,0 +1,266 @@
+# workers.py
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import hashlib
+import logging
+from store import store
+from token_cache import cache_key
+from pairs import PairRecord
+from pair_index import pair_index
+from watchlists import watchlists
+
+logger = logging.getLogger("monitor_workers")
+
+MONITOR_WORKERS = int(os.getenv("MONITOR_WORKERS", "0"))                # 0 = monitor runs inside the bot process
+WORKER_SYNC_INTERVAL = float(os.getenv("WORKER_SYNC_INTERVAL", "5"))    # seconds between store syncs and health checks
+WORKER_RELEASE_TIMEOUT = float(os.getenv("WORKER_RELEASE_TIMEOUT", "30"))  # a worker slower than this to hand over is killed
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "monitor_worker.py")
+LINE_LIMIT = 2 ** 24  # one IPC message per line
+
+
+def owner_of(address, worker_ids):
+    """Rendezvous hash: adding or removing a worker only moves the tokens that land on or left it."""
+    key = cache_key(address).encode()
+    return max(worker_ids, key=lambda w: hashlib.blake2b(b"%d:%s" % (w, key), digest_size=8).digest())
+
+
+class Worker:
+    """Handle on one monitor_worker.py child, talking JSON lines over its stdin/stdout."""
+
+    def __init__(self, worker_id, process):
+        self.id = worker_id
+        self.process = process
+        self.ready = asyncio.get_running_loop().create_future()
+        self._acks = {}  # request id: Future resolved by the worker's "released" event
+        self._ids = 0
+
+    def send(self, op, **payload):
+        self.process.stdin.write(json.dumps({"op": op, **payload}).encode() + b"\n")
+
+    async def release(self, addresses):
+        """Ask the worker to stop polling addresses; returns once it has. A worker that doesn't answer is killed."""
+        self._ids += 1
+        request_id = self._ids
+        future = self._acks[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            self.send("release", id=request_id, addresses=addresses)
+            await self.process.stdin.drain()
+            await asyncio.wait_for(future, WORKER_RELEASE_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError):
+            logger.error(f"Monitor worker {self.id} didn't release {len(addresses)} tokens; killing it")
+            if self.process.returncode is None:
+                self.process.kill()
+            await self.process.wait()
+        finally:
+            self._acks.pop(request_id, None)
+
+    def acked(self, request_id):
+        future = self._acks.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+
+class WorkerPool:
+    """Runs the token monitor sharded over child processes; the bot process keeps only the assignment.
+
+    Tokens are split by rendezvous hashing of their address. When the pool grows or shrinks, a token
+    moves only after its old worker acknowledges it has stopped polling it, so no token is polled twice.
+    Workers send alert, live card and expiry events back; alerts are rendered and sent from here.
+    """
+
+    def __init__(self, size=MONITOR_WORKERS):
+        self.size = size
+        self.workers = {}    # worker id: Worker
+        self.assigned = {}   # token_address: worker id
+        self._readers = {}   # worker id: Task reading its events
+        self._handlers = set()  # alert and live card Tasks started by the readers
+        self._lock = asyncio.Lock()  # one assignment change at a time
+        self.is_running = False
+        self.rebalanced = 0
+
+    async def add_token(self, address, network=None, duration=None):
+        from monitor import monitor
+        expires_at = await monitor.save_activation(address, network, duration)
+        if not self.is_running:
+            return  # another replica runs the pool and picks it up from the store
+        async with self._lock:
+            await self._assign([{"address": address, "expires_at": expires_at}])
+
+    # ---------------- Processes ---------------- #
+    async def _spawn(self, worker_id):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT, str(worker_id),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=LINE_LIMIT,
+        )
+        worker = self.workers[worker_id] = Worker(worker_id, process)
+        self._readers[worker_id] = asyncio.create_task(self._read_events(worker))
+        await worker.ready
+        logger.info(f"Monitor worker {worker_id} started (pid {process.pid})")
+        return worker
+
+    async def _read_events(self, worker):
+        from monitor import monitor
+        while True:
+            line = await worker.process.stdout.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+                event = message.pop("event")
+                if event == "alert":
+                    self._handle(monitor.post_alert(PairRecord.from_dict(message["pair"]), message["label"],
+                                                    address=message["address"], kinds=message["kinds"]))
+                elif event == "pairs":
+                    for address, pair in message["pairs"].items():
+                        pair_index.update(address, {pair["chain"]: PairRecord.from_dict(pair)})
+                elif event == "live":
+                    self._handle(monitor.live_cards.update(message["address"], PairRecord.from_dict(message["pair"])))
+                elif event == "expired":
+                    for address in message["addresses"]:
+                        if self.assigned.get(address) == worker.id:
+                            del self.assigned[address]
+                        monitor.live_cards.forget(address)
+                    watchlists.forget(message["addresses"])
+                elif event == "released":
+                    worker.acked(message["id"])
+                elif event == "ready":
+                    worker.ready.set_result(None)
+            except Exception as e:
+                logger.error(f"Bad event from monitor worker {worker.id}: {e}")
+        if not worker.ready.done():
+            worker.ready.set_exception(RuntimeError(f"monitor worker {worker.id} exited during startup"))
+
+    def _handle(self, coro):
+        """Run an event's sends off the read loop: a full send queue must not stop the pipe being drained."""
+        task = asyncio.create_task(coro)
+        self._handlers.add(task)
+        task.add_done_callback(self._handled)
+
+    def _handled(self, task):
+        self._handlers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to handle monitor worker event: {task.exception()}")
+
+    async def _stop_worker(self, worker, timeout=10):
+        if worker.process.returncode is None:
+            try:
+                worker.send("stop")
+                await asyncio.wait_for(worker.process.wait(), timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                worker.process.kill()
+                await worker.process.wait()
+        self.workers.pop(worker.id, None)
+        reader = self._readers.pop(worker.id, None)
+        if reader is not None:
+            await reader
+
+    # ---------------- Assignment ---------------- #
+    async def _assign(self, rows):
+        by_worker = {}
+        for row in rows:
+            worker_id = owner_of(row["address"], list(self.workers))
+            self.assigned[row["address"]] = worker_id
+            by_worker.setdefault(worker_id, []).append(row)
+        for worker_id, tokens in by_worker.items():
+            worker = self.workers[worker_id]
+            worker.send("assign", tokens=tokens)
+            await worker.process.stdin.drain()
+
+    async def sync(self):
+        """Assign active tokens no worker has yet: restored after a restart, orphaned, or saved by other replicas."""
+        rows = await asyncio.to_thread(store.load_active)
+        await self._assign([row for row in rows if row["address"] not in self.assigned])
+
+    async def _rebalance(self):
+        """Move tokens whose owner changed, each only after its old worker has let go of it."""
+        moves = {}
+        for address, worker_id in self.assigned.items():
+            if owner_of(address, list(self.workers)) != worker_id:
+                moves.setdefault(worker_id, []).append(address)
+        for worker_id, addresses in moves.items():
+            worker = self.workers.get(worker_id)
+            if worker is not None:
+                await worker.release(addresses)
+            for address in addresses:
+                del self.assigned[address]
+        if moves:
+            self.rebalanced += sum(len(a) for a in moves.values())
+            logger.info(f"Rebalanced {sum(len(a) for a in moves.values())} tokens over {len(self.workers)} workers")
+        await self.sync()  # reloads moved tokens with the snapshot their old worker saved last
+
+    async def add_worker(self):
+        async with self._lock:
+            await self._spawn(max(self.workers, default=-1) + 1)
+            await self._rebalance()
+
+    async def remove_worker(self):
+        async with self._lock:
+            if len(self.workers) <= 1:
+                return
+            worker = self.workers[max(self.workers)]
+            addresses = [a for a, w in self.assigned.items() if w == worker.id]
+            if addresses:
+                await worker.release(addresses)
+            for address in addresses:
+                del self.assigned[address]
+            await self._stop_worker(worker)
+            await self.sync()
+            logger.info(f"Monitor worker {worker.id} removed; {len(self.workers)} left")
+
+    async def _check_workers(self):
+        """Respawn workers that died; their tokens go back to the replacement under the same id."""
+        for worker in list(self.workers.values()):
+            if worker.process.returncode is None:
+                continue
+            logger.error(f"Monitor worker {worker.id} exited with {worker.process.returncode}; restarting")
+            await self._stop_worker(worker)
+            for address in [a for a, w in self.assigned.items() if w == worker.id]:
+                del self.assigned[address]
+            await self._spawn(worker.id)
+
+    # ---------------- Lifecycle ---------------- #
+    async def run(self):
+        from monitor import monitor
+        from live_cards import LIVE_CARDS
+        self.is_running = True
+        loop = asyncio.get_running_loop()
+        if LIVE_CARDS:
+            await monitor.live_cards.load()
+        async with self._lock:
+            for worker_id in range(self.size):
+                await self._spawn(worker_id)
+        # kill -USR1 / -USR2 <bot pid> adds or removes a worker without a restart
+        loop.add_signal_handler(signal.SIGUSR1, lambda: asyncio.ensure_future(self.add_worker()))
+        loop.add_signal_handler(signal.SIGUSR2, lambda: asyncio.ensure_future(self.remove_worker()))
+        try:
+            while self.is_running:
+                async with self._lock:
+                    await self._check_workers()
+                    await self.sync()
+                await monitor.live_cards.flush()
+                deadline = time.monotonic() + WORKER_SYNC_INTERVAL
+                while self.is_running and time.monotonic() < deadline:
+                    await asyncio.sleep(0.5)
+        finally:
+            loop.remove_signal_handler(signal.SIGUSR1)
+            loop.remove_signal_handler(signal.SIGUSR2)
+            async with self._lock:
+                await asyncio.gather(*(self._stop_worker(w) for w in list(self.workers.values())))
+                self.assigned.clear()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await monitor.live_cards.flush()
+            logger.info("Monitor workers stopped")
+
+    def stats(self):
+        counts = {}
+        for worker_id in self.assigned.values():
+            counts[worker_id] = counts.get(worker_id, 0) + 1
+        return {"workers": len(self.workers), "tokens": len(self.assigned), "per_worker": counts,
+                "rebalanced": self.rebalanced, "pending_events": len(self._handlers)}
+
+
+worker_pool = WorkerPool()